@@ -2,6 +2,7 @@
 # backup_restore_db.py - Sistema de backup e restauração do banco
 import asyncio
 import aiosqlite
+import gzip
 import json
 import sys
 from datetime import datetime
@@ -43,6 +44,17 @@ async def backup_database(backup_file: str = None):
         except:
             print("⚠️ Tabela match_participants não encontrada ou vazia")
         
+        # Participações de temporadas arquivadas
+        archived_participants = []
+        try:
+            async with aiosqlite.connect(db_manager.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute('SELECT * FROM match_participants_archive') as cursor:
+                    rows = await cursor.fetchall()
+                    archived_participants = [dict(row) for row in rows]
+        except:
+            print("⚠️ Tabela match_participants_archive não encontrada ou vazia")
+        
         # Criar estrutura do backup
         backup_data = {
             "backup_date": datetime.now().isoformat(),
@@ -52,7 +64,8 @@ async def backup_database(backup_file: str = None):
             "data": {
                 "players": players,
                 "matches": matches,
-                "match_participants": participants
+                "match_participants": participants,
+                "match_participants_archive": archived_participants
             }
         }
         
@@ -74,13 +87,91 @@ async def backup_database(backup_file: str = None):
         print(f"❌ Erro ao criar backup: {e}")
         return None
 
+# Tabelas incluídas nos backups (JSON e NDJSON)
+BACKUP_TABLES = ('players', 'matches', 'match_participants', 'match_participants_archive')
+
+# Registros lidos por fetchmany e serializados/comprimidos de uma vez em uma thread
+EXPORT_BATCH_SIZE = 1000
+
+def _write_ndjson_batch(fp, table: str, columns: list, rows: list) -> None:
+    fp.write(''.join(
+        json.dumps({'table': table, 'data': dict(zip(columns, row))}, ensure_ascii=False, default=str) + '\n'
+        for row in rows
+    ))
+
+async def export_database_ndjson(backup_file: str, header: dict = None):
+    """Exporta as tabelas de backup em NDJSON comprimido, em lotes direto do cursor.
+
+    A primeira linha é o cabeçalho, seguida de uma linha {"table", "data"} por registro
+    e um resumo com as contagens. A leitura acontece em uma única transação, então o
+    arquivo é um retrato consistente do banco sem nunca carregá-lo inteiro na memória;
+    serialização e gzip rodam fora do event loop (asyncio.to_thread).
+    """
+    try:
+        counts = {}
+        fp = await asyncio.to_thread(gzip.open, backup_file, 'wt', encoding='utf-8', compresslevel=6)
+        try:
+            await asyncio.to_thread(fp.write, json.dumps({
+                'type': 'header',
+                'format': 'ndjson',
+                'version': '2.0',
+                'backup_date': datetime.now().isoformat(),
+                'tables': list(BACKUP_TABLES),
+                **(header or {})
+            }, ensure_ascii=False, default=str) + '\n')
+            async with aiosqlite.connect(db_manager.db_path) as db:
+                await db.execute('BEGIN')
+                for table in BACKUP_TABLES:
+                    counts[table] = 0
+                    async with db.execute(f'SELECT * FROM {table}') as cursor:
+                        columns = [column[0] for column in cursor.description]
+                        while True:
+                            rows = await cursor.fetchmany(EXPORT_BATCH_SIZE)
+                            if not rows:
+                                break
+                            await asyncio.to_thread(_write_ndjson_batch, fp, table, columns, rows)
+                            counts[table] += len(rows)
+                await db.rollback()
+            await asyncio.to_thread(fp.write, json.dumps({'type': 'summary', 'counts': counts}) + '\n')
+        finally:
+            await asyncio.to_thread(fp.close)
+
+        file_size = Path(backup_file).stat().st_size / 1024  # KB
+        print(f"✅ Exportação NDJSON criada: {backup_file} ({file_size:.1f} KB, {counts.get('players', 0)} jogadores)")
+        return backup_file
+    except Exception as e:
+        print(f"❌ Erro ao exportar banco em NDJSON: {e}")
+        return None
+
+def _load_ndjson_backup(backup_file: str) -> dict:
+    """Converte um export NDJSON (.ndjson.gz) para a mesma estrutura do backup JSON."""
+    header = {}
+    data = {table: [] for table in BACKUP_TABLES}
+    with gzip.open(backup_file, 'rt', encoding='utf-8') as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('type') == 'header':
+                header = entry
+            elif 'table' in entry:
+                data.setdefault(entry['table'], []).append(entry['data'])
+    return {
+        'backup_date': header.get('backup_date'),
+        'version': header.get('version'),
+        'total_players': len(data['players']),
+        'total_matches': len(data['matches']),
+        'data': data
+    }
+
 async def restore_database(backup_file: str, confirm: bool = False):
-    """Restaura banco de dados a partir de backup JSON.
+    """Restaura banco de dados a partir de backup JSON ou export NDJSON (.ndjson.gz).
 
     Campos restaurados:
     - players: inclui username, last_rank_sync_at, rank_sync_source
     - matches: inclui guild_id, pdl_summary, created_at
     - match_participants: inclui result, pdl_change, is_mvp, is_bagre, created_at
+    - match_participants_archive: participações de temporadas anteriores, com id e season_name
     - metadata: preserva a flag de reset de temporada para evitar novo reset automático
     """
     try:
@@ -89,9 +180,12 @@ async def restore_database(backup_file: str, confirm: bool = False):
             print(f"❌ Arquivo de backup não encontrado: {backup_file}")
             return False
         
-        # Carregar backup
-        with open(backup_file, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
+        # Carregar backup (JSON ou export NDJSON comprimido)
+        if backup_file.endswith('.gz'):
+            backup_data = _load_ndjson_backup(backup_file)
+        else:
+            with open(backup_file, 'r', encoding='utf-8') as f:
+                backup_data = json.load(f)
         
         print(f"📋 Informações do Backup:")
         print(f"📅 Data: {backup_data.get('backup_date', 'Desconhecida')}")
@@ -112,6 +206,7 @@ async def restore_database(backup_file: str, confirm: bool = False):
         # Limpar dados existentes
         async with aiosqlite.connect(db_manager.db_path) as db:
             await db.execute("DELETE FROM match_participants")
+            await db.execute("DELETE FROM match_participants_archive")
             await db.execute("DELETE FROM matches")
             await db.execute("DELETE FROM players")
             await db.commit()
@@ -175,10 +270,11 @@ async def restore_database(backup_file: str, confirm: bool = False):
                     try:
                         await db.execute('''
                             INSERT INTO match_participants
-                            (match_id, discord_id, team, champion, kills, deaths, assists, damage_dealt, result, pdl_change, is_mvp, is_bagre, created_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            (id, match_id, discord_id, team, champion, kills, deaths, assists, damage_dealt, result, pdl_change, is_mvp, is_bagre, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         ''', (
-                            mp['match_id'], mp['discord_id'], mp.get('team'), mp.get('champion'),
+                            # Mantém o id original: a paginação do histórico assume ids do arquivo menores que os atuais
+                            mp.get('id'), mp['match_id'], mp['discord_id'], mp.get('team'), mp.get('champion'),
                             mp.get('kills', 0), mp.get('deaths', 0), mp.get('assists', 0), mp.get('damage_dealt', 0),
                             mp.get('result'), mp.get('pdl_change', 0), mp.get('is_mvp', 0), mp.get('is_bagre', 0),
                             mp.get('created_at')
@@ -189,6 +285,25 @@ async def restore_database(backup_file: str, confirm: bool = False):
                 await db.commit()
             print(f"🧾 Participações restauradas: {restored_participants}/{len(participants_data)}")
 
+        archived_data = backup_data['data'].get('match_participants_archive', [])
+        if archived_data:
+            async with aiosqlite.connect(db_manager.db_path) as db:
+                await db.executemany('''
+                    INSERT OR IGNORE INTO match_participants_archive
+                    (season_name, id, match_id, discord_id, team, champion, kills, deaths, assists, damage_dealt, result, pdl_change, is_mvp, is_bagre, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (
+                        mp['season_name'], mp['id'], mp['match_id'], mp['discord_id'], mp.get('team'), mp.get('champion'),
+                        mp.get('kills', 0), mp.get('deaths', 0), mp.get('assists', 0), mp.get('damage_dealt', 0),
+                        mp.get('result'), mp.get('pdl_change', 0), mp.get('is_mvp', 0), mp.get('is_bagre', 0),
+                        mp.get('created_at')
+                    )
+                    for mp in archived_data
+                ])
+                await db.commit()
+            print(f"🗄️ Participações arquivadas restauradas: {len(archived_data)}")
+
         # Marcar metadata para evitar reset automático de temporada após restore
         now_iso = datetime.now().isoformat()
         await db_manager.set_metadata('season_reset_v2', now_iso)
@@ -254,12 +369,14 @@ async def show_help():
     print("Uso: python backup_restore_db.py [comando] [argumentos]")
     print("\nComandos disponíveis:")
     print("  backup [arquivo]           - Cria backup do banco atual")
-    print("  restore [arquivo]          - Restaura banco de um backup")
+    print("  export [arquivo]           - Exporta o banco em NDJSON comprimido (.ndjson.gz)")
+    print("  restore [arquivo]          - Restaura banco de um backup (.json ou .ndjson.gz)")
     print("  migrate                    - Prepara migração para Render")
     print("  help                       - Mostra esta ajuda")
     print("\nExemplos:")
     print("  python backup_restore_db.py backup")
     print("  python backup_restore_db.py backup meu_backup.json")
+    print("  python backup_restore_db.py export backup.ndjson.gz")
     print("  python backup_restore_db.py restore backup_20250926_123456.json")
     print("  python backup_restore_db.py migrate")
 
@@ -275,6 +392,10 @@ async def main():
             backup_file = sys.argv[2] if len(sys.argv) > 2 else None
             await backup_database(backup_file)
         
+        elif command == "export":
+            backup_file = sys.argv[2] if len(sys.argv) > 2 else f"backup_database_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+            await export_database_ndjson(backup_file)
+        
         elif command == "restore":
             if len(sys.argv) < 3:
                 print("❌ Uso: python backup_restore_db.py restore [arquivo_backup]")
@@ -1,11 +1,18 @@
+import asyncio
+import os
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import Optional, List
+from typing import Optional, List, Iterable, Awaitable, Callable
 
 from utils.database_manager import db_manager
 from utils.ops_logger import log_ops_event
 
+# Edições de role compartilham o bucket de rate limit do guild; limitamos a concorrência
+# e espaçamos as chamadas de cada worker para não esgotá-lo.
+BADGE_ROLE_CONCURRENCY = int(os.getenv('BADGE_ROLE_CONCURRENCY', '3'))
+BADGE_ROLE_STAGGER_SECONDS = float(os.getenv('BADGE_ROLE_STAGGER_SECONDS', '0.25'))
+
 BADGE_CHOICES = [
     app_commands.Choice(name="Fila Ativa", value="queue_active"),
     app_commands.Choice(name="Top Ranking", value="top_rank")
@@ -52,23 +59,29 @@ class BadgesCog(commands.Cog):
         await interaction.followup.send("🔔 Reavaliação executada!", ephemeral=True)
 
     async def assign_queue_badge(self, member: discord.Member, remove: bool = False):
-        config = await db_manager.get_badge_config(member.guild.id, 'queue_active')
+        await self.assign_queue_badges(member.guild, [member.id], remove=remove)
+
+    async def assign_queue_badges(self, guild: discord.Guild, member_ids: Iterable[int], remove: bool = False):
+        """Aplica/remove a badge de fila para vários membros com uma leitura de config e uma transação."""
+        config = await db_manager.get_badge_config(guild.id, 'queue_active')
         if not config:
             return
-        role = member.guild.get_role(config['role_id'])
-        if not role or not await self._has_role_permissions(member.guild, role):
+        role = guild.get_role(config['role_id'])
+        if not role or not await self._has_role_permissions(guild, role):
             return
+        members = [m for m in (guild.get_member(pid) for pid in member_ids) if m]
         if remove:
-            if role in member.roles:
-                await member.remove_roles(role, reason='Queue finalizada')
-                await db_manager.remove_badge_assignment(member.guild.id, role.id, member.id)
-                await db_manager.increment_metadata_counter('badge_roles_removed')
-            return
-        if role in member.roles:
+            targets = [m for m in members if role in m.roles]
+            changed = await self._apply_role_changes(
+                targets, lambda m: m.remove_roles(role, reason='Queue finalizada')
+            )
+            await db_manager.apply_badge_changes(guild.id, role.id, [], changed)
             return
-        await member.add_roles(role, reason='Fila ativa')
-        await db_manager.record_badge_assignment(member.guild.id, role.id, member.id)
-        await db_manager.increment_metadata_counter('badge_roles_assigned')
+        targets = [m for m in members if role not in m.roles]
+        changed = await self._apply_role_changes(
+            targets, lambda m: m.add_roles(role, reason='Fila ativa')
+        )
+        await db_manager.apply_badge_changes(guild.id, role.id, changed, [])
 
     async def update_top_rank_badge(self, guild: discord.Guild, notify: bool = True):
         config = await db_manager.get_badge_config(guild.id, 'top_rank')
@@ -78,27 +91,50 @@ class BadgesCog(commands.Cog):
         if not role or not await self._has_role_permissions(guild, role):
             return
         top_count = int(config.get('criteria_value') or 5)
-        players = await db_manager.get_all_players()
-        top_players = [p['discord_id'] for p in players[:top_count]]
+        players = await db_manager.get_ranking_snapshot(top_count, guild_id=guild.id)
+        top_players = [p['discord_id'] for p in players]
         current_holders = await db_manager.list_badge_holders(guild.id, role.id)
         to_add = set(top_players) - set(current_holders)
         to_remove = set(current_holders) - set(top_players)
-        for discord_id in to_add:
-            member = guild.get_member(discord_id)
-            if not member:
-                continue
-            if role not in member.roles:
-                await member.add_roles(role, reason='Top ranking badge')
-            await db_manager.record_badge_assignment(guild.id, role.id, discord_id)
-            await db_manager.increment_metadata_counter('badge_roles_assigned')
-            if notify:
-                await self._notify_member(member, role)
-        for discord_id in to_remove:
-            member = guild.get_member(discord_id)
-            if member and role in member.roles:
-                await member.remove_roles(role, reason='Saiu do Top ranking')
-                await db_manager.increment_metadata_counter('badge_roles_removed')
-            await db_manager.remove_badge_assignment(guild.id, role.id, discord_id)
+
+        add_members = [m for m in (guild.get_member(pid) for pid in to_add) if m]
+        added = await self._apply_role_changes(
+            [m for m in add_members if role not in m.roles],
+            lambda m: m.add_roles(role, reason='Top ranking badge')
+        )
+        remove_members = [m for m in (guild.get_member(pid) for pid in to_remove) if m and role in m.roles]
+        removed = await self._apply_role_changes(
+            remove_members, lambda m: m.remove_roles(role, reason='Saiu do Top ranking')
+        )
+        # Só registra o que o Discord confirmou; falhas são refeitas na próxima avaliação
+        await db_manager.apply_badge_changes(guild.id, role.id, added, removed)
+        if notify:
+            for member in add_members:
+                if member.id in added:
+                    await self._notify_member(member, role)
+
+    async def _apply_role_changes(
+        self,
+        members: List[discord.Member],
+        action: Callable[[discord.Member], Awaitable[None]]
+    ) -> List[int]:
+        """Executa edições de role com concorrência limitada; retorna os IDs alterados com sucesso."""
+        if not members:
+            return []
+        semaphore = asyncio.Semaphore(BADGE_ROLE_CONCURRENCY)
+
+        async def worker(member: discord.Member) -> Optional[int]:
+            async with semaphore:
+                try:
+                    await action(member)
+                except discord.HTTPException as exc:
+                    print(f"⚠️ Falha ao atualizar role de {member.id}: {exc}")
+                    return None
+                await asyncio.sleep(BADGE_ROLE_STAGGER_SECONDS)
+                return member.id
+
+        results = await asyncio.gather(*(worker(member) for member in members))
+        return [member_id for member_id in results if member_id is not None]
 
     async def _notify_member(self, member: discord.Member, role: discord.Role):
         try:
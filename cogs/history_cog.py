@@ -5,14 +5,22 @@ from datetime import datetime, timedelta
 from typing import Optional, List
 
 from utils.database_manager import db_manager
+from utils import rolling_stats
+
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"
+HISTORY_PAGE_SIZE = 10
+SEARCH_PAGE_SIZE = 8
+TEAM_LABELS = {'azul': "🔵 Time Azul", 'vermelho': "🔴 Time Vermelho"}
 
 class HistoryCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.weekly_cards_task.start()
+        self.daily_rollup_task.start()
 
     def cog_unload(self):
         self.weekly_cards_task.cancel()
+        self.daily_rollup_task.cancel()
 
     @app_commands.command(name="historico", description="Mostra o histórico recente de um jogador.")
     @app_commands.describe(
@@ -28,28 +36,90 @@ class HistoryCog(commands.Cog):
             return
 
         await interaction.response.defer()
-        matches = await db_manager.get_recent_matches_for_player(target.id, periodo, limit=50)
-        if not matches:
-            await interaction.followup.send(f"📭 Nenhuma partida encontrada nos últimos {periodo} dias.", ephemeral=True)
+        rows = await db_manager.get_player_match_page(target.id, HISTORY_PAGE_SIZE)
+        if not rows:
+            await interaction.followup.send("📭 Nenhuma partida registrada para este jogador.", ephemeral=True)
             return
 
-        stats = self._compute_stats(matches)
         embed = discord.Embed(
             title=f"Histórico de {player_data.get('riot_id') or target.display_name}",
             color=discord.Color.teal()
         )
-        embed.add_field(name="Período", value=f"{periodo} dias", inline=True)
-        embed.add_field(name="Partidas", value=f"{stats['wins']}V / {stats['losses']}D", inline=True)
-        embed.add_field(name="Streak", value=stats['streak_text'], inline=True)
-        embed.add_field(name="Média de PDL", value=f"{stats['avg_pdl']:+.1f}", inline=True)
-        embed.add_field(name="MVPs consecutivos", value=str(stats['mvp_streak']), inline=True)
-        embed.add_field(name="Destaque", value=stats['highlight'], inline=False)
-        embed.add_field(name="Últimas partidas", value=stats['recent_text'], inline=False)
+        window = await db_manager.get_player_window_stats(target.id, periodo)
+        embed.add_field(name="Partidas", value=f"{player_data['wins']}V / {player_data['losses']}D", inline=True)
+        embed.add_field(
+            name=f"Últimos {periodo} dias",
+            value=f"{window['wins']}V / {window['losses']}D • {window['pdl_delta']:+} PDL",
+            inline=True
+        )
+        rolling = await db_manager.get_player_rolling_stats(target.id)
+        if rolling and rolling['recent_count']:
+            stats = self._compute_stats(rolling)
+            embed.add_field(name="Streak", value=stats['streak_text'], inline=True)
+            embed.add_field(name="Maior streak", value=f"{rolling['best_win_streak']} vitórias", inline=True)
+            embed.add_field(name=f"Média de PDL (últimas {rolling['recent_count']})", value=f"{stats['avg_pdl']:+.1f}", inline=True)
+            embed.add_field(name="MVPs consecutivos", value=f"{rolling['mvp_streak']} (recorde {rolling['best_mvp_streak']})", inline=True)
+            embed.add_field(name="Forma recente", value=stats['form_text'], inline=True)
+            embed.add_field(name="Destaque", value=stats['highlight'], inline=False)
+        series = await db_manager.get_pdl_series(target.id, periodo, max_points=30)
+        if len(series) >= 2:
+            values = [point['pdl'] for point in series]
+            embed.add_field(
+                name=f"Evolução de PDL ({periodo} dias)",
+                value=f"`{self._sparkline(values)}`\n{values[0]} → {values[-1]} (mín {min(values)} • máx {max(values)})",
+                inline=False
+            )
         embed.set_footer(text="Dados baseados nos registros do bot")
 
-        await interaction.followup.send(embed=embed)
+        view = MatchHistoryView(interaction.user.id, target.id, embed, rows[:HISTORY_PAGE_SIZE], len(rows) > HISTORY_PAGE_SIZE)
+        view.message = await interaction.followup.send(embeds=view.embeds(), view=view)
         await db_manager.increment_metadata_counter('historico_used')
 
+    @app_commands.command(name="partida", description="Mostra os detalhes de uma partida registrada.")
+    @app_commands.describe(id="ID da partida (mostrado no /historico e no /partidas)")
+    @app_commands.checks.cooldown(1, 3.0, key=lambda i: (i.guild_id, i.user.id))
+    async def partida(self, interaction: discord.Interaction, id: str):
+        match_id = id.strip().strip('`')
+        if '-' not in match_id:
+            # Aceita só o sufixo; o prefixo é sempre o id da guild
+            match_id = f"{interaction.guild_id}-{match_id}"
+        match = await db_manager.get_match_details(match_id)
+        if not match or match['guild_id'] not in (interaction.guild_id, 0, None):
+            await interaction.response.send_message("❌ Partida não encontrada neste servidor.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=self._match_embed(match))
+
+    @app_commands.command(name="partidas", description="Busca partidas do servidor por jogador, vencedor e período.")
+    @app_commands.describe(
+        jogador="Somente partidas com este jogador",
+        vencedor="Somente partidas vencidas por este time",
+        dias="Somente partidas dos últimos N dias (1-365)"
+    )
+    @app_commands.choices(vencedor=[
+        app_commands.Choice(name="Time Azul", value="azul"),
+        app_commands.Choice(name="Time Vermelho", value="vermelho"),
+    ])
+    @app_commands.checks.cooldown(1, 5.0, key=lambda i: (i.guild_id, i.user.id))
+    async def partidas(
+        self,
+        interaction: discord.Interaction,
+        jogador: Optional[discord.Member] = None,
+        vencedor: Optional[app_commands.Choice[str]] = None,
+        dias: Optional[app_commands.Range[int, 1, 365]] = None
+    ):
+        filters = {
+            'discord_id': jogador.id if jogador else None,
+            'winner': vencedor.value if vencedor else None,
+            'since': (datetime.utcnow() - timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S') if dias else None,
+        }
+        await interaction.response.defer()
+        matches = await db_manager.search_matches(interaction.guild_id, limit=SEARCH_PAGE_SIZE, **filters)
+        if not matches:
+            await interaction.followup.send("📭 Nenhuma partida encontrada com esses filtros.", ephemeral=True)
+            return
+        view = MatchSearchView(interaction.user.id, interaction.guild_id, filters, matches)
+        view.message = await interaction.followup.send(embed=view.embed(), view=view)
+
     @app_commands.command(name="historico_configurar_cartao", description="Define canal para o cartão semanal de destaques.")
     @app_commands.describe(canal="Canal que receberá os cartões")
     async def configurar_cartao(self, interaction: discord.Interaction, canal: discord.TextChannel):
@@ -81,72 +151,64 @@ class HistoryCog(commands.Cog):
         await db_manager.set_metadata(f'weekly_card_last_{interaction.guild_id}', datetime.utcnow().isoformat())
         await interaction.followup.send("✅ Cartão enviado!", ephemeral=True)
 
-    def _compute_stats(self, matches: List[dict]) -> dict:
-        wins = sum(1 for m in matches if m.get('result') == 'win')
-        losses = sum(1 for m in matches if m.get('result') == 'loss')
-        avg_pdl = sum(m.get('pdl_change', 0) for m in matches) / len(matches)
-        streak_type = matches[0].get('result')
-        streak = 0
-        for match in matches:
-            if match.get('result') == streak_type:
-                streak += 1
-            else:
-                break
-        streak_text = f"{streak} {'vitórias' if streak_type == 'win' else 'derrotas'}"
-        mvp_streak = 0
-        current = 0
-        for match in matches:
-            if match.get('is_mvp'):
-                current += 1
-                mvp_streak = max(mvp_streak, current)
-            else:
-                current = 0
-        recent_lines = []
-        for match in matches[:5]:
-            icon = '✅' if match.get('result') == 'win' else '❌'
-            delta = match.get('pdl_change', 0)
-            timestamp = match.get('created_at')
-            recent_lines.append(f"{icon} {timestamp[:10]} • {delta:+} PDL")
+    def _compute_stats(self, rolling: dict) -> dict:
+        """Formata a linha de player_rolling_stats (streaks e janela das últimas partidas)."""
+        streak = rolling['current_streak']
+        streak_text = f"{abs(streak)} {'vitórias' if streak > 0 else 'derrotas'}"
+        avg_pdl = rolling['recent_pdl_sum'] / rolling['recent_count']
+        results = rolling_stats.recent_results(rolling, 10)
+        form_text = "".join('🟢' if won else '🔴' for won in results)
         highlight = "Sem destaques recentes"
-        if mvp_streak >= 2:
-            highlight = f"⭐ {mvp_streak} MVPs consecutivos"
+        if rolling['mvp_streak'] >= 2:
+            highlight = f"⭐ {rolling['mvp_streak']} MVPs consecutivos"
         elif abs(avg_pdl) >= 10:
             highlight = f"🔥 Variação média de {avg_pdl:+.1f} PDL"
         return {
-            'wins': wins,
-            'losses': losses,
             'avg_pdl': avg_pdl,
             'streak_text': streak_text,
-            'mvp_streak': mvp_streak,
-            'recent_text': "\n".join(recent_lines),
+            'form_text': form_text,
             'highlight': highlight,
         }
 
+    def _match_embed(self, match: dict) -> discord.Embed:
+        winner = match['winner']
+        embed = discord.Embed(
+            title=f"Partida `{match['match_id']}`",
+            description=f"{match['created_at'][:16]} • vitória do {TEAM_LABELS.get(winner, winner)}",
+            color=discord.Color.blue() if winner == "azul" else discord.Color.red()
+        )
+        for team in ('azul', 'vermelho'):
+            lines = [
+                f"• <@{player['discord_id']}> ({player['pdl_change']:+} PDL)"
+                + (" ⭐" if player['is_mvp'] else "") + (" 💩" if player['is_bagre'] else "")
+                for player in match['participants'] if player['team'] == team
+            ]
+            suffix = " (Vencedor)" if team == winner else ""
+            embed.add_field(name=f"{TEAM_LABELS[team]}{suffix}", value="\n".join(lines) or "Sem dados", inline=True)
+        if match.get('duration'):
+            embed.set_footer(text=f"Duração: {match['duration'] // 60} min")
+        return embed
+
+    def _sparkline(self, values: List[int]) -> str:
+        low, high = min(values), max(values)
+        if high == low:
+            return SPARKLINE_BLOCKS[3] * len(values)
+        scale = (len(SPARKLINE_BLOCKS) - 1) / (high - low)
+        return "".join(SPARKLINE_BLOCKS[int((value - low) * scale)] for value in values)
+
     async def _build_weekly_card(self, guild_id: int, guild_name: str) -> Optional[discord.Embed]:
-        rows = await db_manager.get_guild_recent_participation(guild_id, days=7)
-        if not rows:
+        highlights = await db_manager.get_guild_weekly_highlights(guild_id, days=7, top=3)
+        if not highlights['wins']:
             return None
-        stats = {}
-        for row in rows:
-            data = stats.setdefault(row['discord_id'], {'wins': 0, 'losses': 0, 'mvps': 0, 'pdl': 0})
-            if row.get('result') == 'win':
-                data['wins'] += 1
-            elif row.get('result') == 'loss':
-                data['losses'] += 1
-            if row.get('is_mvp'):
-                data['mvps'] += 1
-            data['pdl'] += row.get('pdl_change', 0)
-        sorted_by_wins = sorted(stats.items(), key=lambda item: item[1]['wins'], reverse=True)
-        sorted_by_mvps = sorted(stats.items(), key=lambda item: item[1]['mvps'], reverse=True)
         embed = discord.Embed(
             title=f"🏅 Destaques da Semana - {guild_name}",
             description="Últimos 7 dias",
             color=discord.Color.gold()
         )
-        def format_entry(discord_id, data):
-            return f"<@{discord_id}> • {data['wins']}V/{data['losses']}D • ⭐ {data['mvps']} • {data['pdl']:+} PDL"
-        top_wins = [format_entry(pid, data) for pid, data in sorted_by_wins[:3]]
-        top_mvps = [format_entry(pid, data) for pid, data in sorted_by_mvps[:3]]
+        def format_entry(data):
+            return f"<@{data['discord_id']}> • {data['wins']}V/{data['losses']}D • ⭐ {data['mvps']} • {data['pdl']:+} PDL"
+        top_wins = [format_entry(data) for data in highlights['wins']]
+        top_mvps = [format_entry(data) for data in highlights['mvps']]
         embed.add_field(name="Top Vitórias", value="\n".join(top_wins) or "Sem dados", inline=False)
         embed.add_field(name="Top MVPs", value="\n".join(top_mvps) or "Sem dados", inline=False)
         embed.set_footer(text="Gerado automaticamente pelo bot ARAM")
@@ -176,5 +238,146 @@ class HistoryCog(commands.Cog):
             await channel.send(embed=embed)
             await db_manager.set_metadata(f'weekly_card_last_{guild.id}', datetime.utcnow().isoformat())
 
+    @tasks.loop(hours=24)
+    async def daily_rollup_task(self):
+        # O rollup já é incrementado a cada partida; aqui só corrigimos os últimos dias
+        await db_manager.reconcile_daily_stats(days=2)
+
+class MatchHistoryView(discord.ui.View):
+    """Partidas do /historico em páginas; guarda só a página atual e busca a vizinha pelo id."""
+
+    def __init__(self, author_id: int, target_id: int, summary: discord.Embed, rows: List[dict], has_older: bool):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.target_id = target_id
+        self.summary = summary
+        self.rows = rows
+        self.page = 1
+        self.has_older = has_older
+        self.message: Optional[discord.Message] = None
+        self._sync_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Use `/historico` para navegar no seu próprio histórico.", ephemeral=True)
+            return False
+        return True
+
+    def _sync_buttons(self):
+        self.newer_page.disabled = self.page <= 1
+        self.older_page.disabled = not self.has_older
+
+    def embeds(self) -> List[discord.Embed]:
+        page_embed = discord.Embed(title=f"Partidas • página {self.page}", color=discord.Color.teal())
+        lines = []
+        for row in self.rows:
+            icon = '✅' if row.get('result') == 'win' else '❌'
+            extras = (" ⭐" if row.get('is_mvp') else "") + (" 💩" if row.get('is_bagre') else "")
+            lines.append(f"{icon} {row['created_at'][:16]} • {row.get('pdl_change', 0):+} PDL{extras} • `{row['match_id']}`")
+        page_embed.description = "\n".join(lines) or "Sem partidas registradas"
+        return [self.summary, page_embed]
+
+    @discord.ui.button(label="◀️ Mais recentes", style=discord.ButtonStyle.secondary)
+    async def newer_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        rows = await db_manager.get_player_match_page(self.target_id, HISTORY_PAGE_SIZE, after_id=self.rows[0]['id'])
+        if not rows:
+            await interaction.response.send_message("Não há partidas mais recentes.", ephemeral=True)
+            return
+        self.rows = rows[-HISTORY_PAGE_SIZE:]
+        self.page = max(1, self.page - 1)
+        self.has_older = True
+        self._sync_buttons()
+        await interaction.response.edit_message(embeds=self.embeds(), view=self)
+
+    @discord.ui.button(label="Mais antigas ▶️", style=discord.ButtonStyle.secondary)
+    async def older_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        rows = await db_manager.get_player_match_page(self.target_id, HISTORY_PAGE_SIZE, before_id=self.rows[-1]['id'])
+        if not rows:
+            await interaction.response.send_message("Não há partidas mais antigas.", ephemeral=True)
+            return
+        self.rows = rows[:HISTORY_PAGE_SIZE]
+        self.page += 1
+        self.has_older = len(rows) > HISTORY_PAGE_SIZE
+        self._sync_buttons()
+        await interaction.response.edit_message(embeds=self.embeds(), view=self)
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+class MatchSearchView(discord.ui.View):
+    """Resultado do /partidas; cada página é uma consulta com o cursor (created_at, id) da anterior."""
+
+    def __init__(self, author_id: int, guild_id: int, filters: dict, matches: List[dict]):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.filters = filters
+        # Cursor de início de cada página já vista, para voltar sem consulta reversa
+        self.cursors: List[Optional[tuple]] = [None]
+        self.message: Optional[discord.Message] = None
+        self._set_page(matches)
+
+    def _set_page(self, matches: List[dict]):
+        self.matches = matches[:SEARCH_PAGE_SIZE]
+        self.has_more = len(matches) > SEARCH_PAGE_SIZE
+        self.previous_page.disabled = len(self.cursors) <= 1
+        self.next_page.disabled = not self.has_more
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Use `/partidas` para fazer sua própria busca.", ephemeral=True)
+            return False
+        return True
+
+    def embed(self) -> discord.Embed:
+        embed = discord.Embed(title=f"Partidas • página {len(self.cursors)}", color=discord.Color.teal())
+        lines = []
+        for match in self.matches:
+            icon = '🔵' if match['winner'] == 'azul' else '🔴'
+            mvp = f" • ⭐ <@{match['mvp_id']}>" if match.get('mvp_id') else ""
+            lines.append(
+                f"{icon} `{match['match_id']}` • {match['created_at'][:16]} • "
+                f"{len(match['participants'])} jogadores{mvp}"
+            )
+        embed.description = "\n".join(lines)
+        embed.set_footer(text="Use /partida <id> para ver os detalhes")
+        return embed
+
+    @discord.ui.button(label="◀️ Anterior", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        matches = await db_manager.search_matches(
+            self.guild_id, limit=SEARCH_PAGE_SIZE, before=self.cursors[-1], **self.filters
+        )
+        self._set_page(matches)
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Próxima ▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        last = self.matches[-1]
+        cursor = (last['created_at'], last['id'])
+        matches = await db_manager.search_matches(self.guild_id, limit=SEARCH_PAGE_SIZE, before=cursor, **self.filters)
+        if not matches:
+            await interaction.response.send_message("Não há mais partidas.", ephemeral=True)
+            return
+        self.cursors.append(cursor)
+        self._set_page(matches)
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(HistoryCog(bot))
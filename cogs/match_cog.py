@@ -7,6 +7,7 @@ import re
 
 from utils.database_manager import db_manager
 from utils.last_team_store import load_last_teams
+from utils.ranking_stream import ranking_broadcaster
 import config
 
 class MatchCog(commands.Cog):
@@ -143,6 +144,7 @@ class MatchCog(commands.Cog):
 
             await db_manager.add_match_participants(match_id, participant_logs)
             await db_manager.increment_metadata_counter('matches_registered')
+            await ranking_broadcaster.refresh()
 
             # Criar embed de resultado
             embed = discord.Embed(
@@ -376,6 +378,7 @@ class MatchCog(commands.Cog):
 
             await db_manager.add_match_participants(match_id, participant_logs)
             await db_manager.increment_metadata_counter('matches_registered')
+            await ranking_broadcaster.refresh()
 
             embed.set_footer(text="⚡ Resultado registrado rapidamente! Use /ranking para ver o ranking.")
             
@@ -58,6 +58,8 @@ class PlayerCog(commands.Cog):
 
             print(f"Salvando no banco de dados...")
             await db_manager.add_player(interaction.user.id, riot_id, puuid, rank.upper(), interaction.user.display_name)
+            if interaction.guild_id:
+                await db_manager.add_guild_player(interaction.guild_id, interaction.user.id)
             print(f"Registro concluído!")
             
             # Buscar elo inicial
@@ -121,6 +123,13 @@ class PlayerCog(commands.Cog):
         embed.add_field(name="🏆 Rank LoL", value=player_data.get('lol_rank', 'Não informado'), inline=True)
         embed.add_field(name=f"{elo_info['emoji']} Elo ARAM", value=f"**{elo_info['name']}**", inline=True)
         embed.add_field(name="📊 PDL", value=f"**{player_data['pdl']}** pontos", inline=True)
+        rank_position = await db_manager.get_player_rank_position(target_user.id, interaction.guild_id)
+        if rank_position:
+            embed.add_field(
+                name="🏅 Posição",
+                value=f"**#{rank_position['position']}** de {rank_position['total']}",
+                inline=True
+            )
         embed.add_field(name="⚖️ Score Balanceamento", value=f"{balance_score}/100", inline=True)
         embed.add_field(name="📈 W/L", value=f"**{player_data['wins']}**W / **{player_data['losses']}**L", inline=True)
         embed.add_field(name="📊 Taxa de Vitória", value=f"**{win_rate:.1f}%**", inline=True)
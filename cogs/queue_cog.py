@@ -1,27 +1,88 @@
 import asyncio
+import os
+import time
 import discord
+from datetime import datetime, timedelta
 from discord import app_commands
 from discord.ext import commands
-from typing import List
+from typing import List, Optional
 
 import config
 from utils.database_manager import db_manager
 from utils.last_team_store import save_last_teams
+from utils.queue_scheduler import QueueScheduler
+from utils import queue_events, queue_metrics
+
+QUEUE_IDLE_TIMEOUT_MINUTES = int(os.getenv('QUEUE_IDLE_TIMEOUT_MINUTES', '20'))
+QUEUE_PLAYER_TIMEOUT_MINUTES = int(os.getenv('QUEUE_PLAYER_TIMEOUT_MINUTES', '60'))
+QUEUE_AUTOSTART_MIN_PLAYERS = int(os.getenv('QUEUE_AUTOSTART_MIN_PLAYERS', '4'))
 
 
 class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie filas ARAM"):
     def __init__(self, bot: commands.Bot):
         super().__init__()
         self.bot = bot
+        self.scheduler = QueueScheduler(self._on_timer)
 
     async def cog_load(self):
+        self.scheduler.start()
+        await self._recover_interrupted_queues()
         await self._restore_views()
 
+    async def cog_unload(self):
+        self.scheduler.stop()
+
     async def _restore_views(self):
         queues = await db_manager.get_active_queues()
         for queue in queues:
             view = QueueView(self, queue['id'])
             self.bot.add_view(view, message_id=queue['message_id'])
+            await self._restore_timers(queue)
+
+    async def _recover_interrupted_queues(self):
+        """Reabre filas que ficaram em 'montando' (queda durante a montagem) usando o log de eventos."""
+        for queue in await db_manager.get_queues_by_status('montando'):
+            state = await db_manager.replay_queue(queue['id'])
+            if state['events']:
+                current = await db_manager.get_queue_players(queue['id'])
+                if current != state['players']:
+                    await db_manager.restore_queue_roster(queue['id'], state['players'], state['waitlist'])
+            await db_manager.update_queue_status(queue['id'], 'aberta', reason='recuperada após reinício')
+            print(f"♻️ Fila {queue['name']} recuperada do log de eventos ({len(state['players'])} jogadores)")
+            asyncio.create_task(self._resume_recovered_queue(queue['id']))
+
+    async def _resume_recovered_queue(self, queue_id: int):
+        await self.bot.wait_until_ready()
+        queue = await db_manager.get_queue(queue_id)
+        if not queue or queue['status'] != 'aberta':
+            return
+        players = await db_manager.get_queue_players(queue_id)
+        if len(players) >= queue['slots']:
+            self._cancel_queue_timers(queue_id)
+            await db_manager.update_queue_status(queue_id, 'montando')
+            await self._finalize_queue(queue, players[:queue['slots']])
+        else:
+            await self._update_queue_embed(queue, players, None)
+            await self._backfill_from_waitlist(queue)
+
+    async def _restore_timers(self, queue: dict):
+        last_activity = _parse_timestamp(queue.get('last_activity_at') or queue.get('created_at'))
+        self.scheduler.schedule_at(('fila', queue['id']), last_activity + timedelta(minutes=QUEUE_IDLE_TIMEOUT_MINUTES))
+        for entry in await db_manager.get_queue_entries(queue['id']):
+            joined_at = _parse_timestamp(entry.get('joined_at'))
+            self.scheduler.schedule_at(
+                ('jogador', queue['id'], entry['discord_id']),
+                joined_at + timedelta(minutes=QUEUE_PLAYER_TIMEOUT_MINUTES)
+            )
+
+    def _touch_queue_timer(self, queue_id: int):
+        self.scheduler.schedule(('fila', queue_id), QUEUE_IDLE_TIMEOUT_MINUTES * 60)
+
+    def _touch_player_timer(self, queue_id: int, discord_id: int):
+        self.scheduler.schedule(('jogador', queue_id, discord_id), QUEUE_PLAYER_TIMEOUT_MINUTES * 60)
+
+    def _cancel_queue_timers(self, queue_id: int):
+        self.scheduler.cancel_where(lambda key: key[1] == queue_id)
 
     @app_commands.command(name="criar", description="Cria uma fila com botões de entrar/sair e montagem automática.")
     @app_commands.guild_only()
@@ -47,29 +108,15 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             await interaction.followup.send("❌ Já existe uma fila aberta com esse nome.", ephemeral=True)
             return
 
-        queue_id = await db_manager.create_queue(
+        queue = await self._open_queue_instance(
             guild_id=interaction.guild_id,
-            channel_id=target_channel.id,
-            message_id=0,
-            name=nome,
+            channel=target_channel,
+            base_name=nome,
             mode=modo,
             slots=slots,
             created_by=interaction.user.id
         )
-
-        view = QueueView(self, queue_id)
-        embed = await self._build_queue_embed({
-            'id': queue_id,
-            'name': nome,
-            'mode': modo,
-            'slots': slots,
-            'guild_id': interaction.guild_id,
-            'status': 'aberta'
-        }, [])
-        message = await target_channel.send(embed=embed, view=view)
-        self.bot.add_view(view, message_id=message.id)
-        await db_manager.update_queue_message(queue_id, message.id)
-        await interaction.followup.send(f"✅ Fila `{nome}` criada em {target_channel.mention}!", ephemeral=True)
+        await interaction.followup.send(f"✅ Fila `{queue['name']}` criada em {target_channel.mention}!", ephemeral=True)
 
     @app_commands.command(name="status", description="Mostra as filas abertas ou o status de uma fila específica.")
     @app_commands.guild_only()
@@ -117,14 +164,47 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             return
 
         players = await db_manager.get_queue_players(queue['id'])
+        self._cancel_queue_timers(queue['id'])
         await self._cleanup_queue_badges(queue, players)
-        await db_manager.update_queue_status(queue['id'], 'cancelada')
+        await db_manager.update_queue_status(queue['id'], 'cancelada', reason=f'cancelada por {interaction.user.id}')
         await self._edit_queue_message(queue, "❌ Fila cancelada", discord.Color.red(), None)
         await interaction.followup.send(f"🛑 Fila `{nome}` cancelada.", ephemeral=True)
 
+    @app_commands.command(name="eventos", description="[ADMIN] Mostra o log de eventos de uma fila.")
+    @app_commands.guild_only()
+    @app_commands.describe(nome="Nome da fila")
+    async def queue_events_log(self, interaction: discord.Interaction, nome: str):
+        await interaction.response.defer(ephemeral=True)
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("❌ Apenas administradores podem consultar o log de filas.", ephemeral=True)
+            return
+
+        queue = await db_manager.get_queue_by_name(interaction.guild_id, nome)
+        if not queue:
+            await interaction.followup.send("❌ Fila não encontrada.", ephemeral=True)
+            return
+
+        state = await db_manager.replay_queue(queue['id'])
+        events = await db_manager.get_queue_events(queue['id'], limit=20)
+        lines = []
+        for event in events:
+            label = queue_events.EVENT_LABELS.get(event['code'], str(event['code']))
+            who = f" <@{event['discord_id']}>" if event.get('discord_id') else ""
+            detail = f" ({event['detail']})" if event.get('detail') else ""
+            lines.append(f"`{event['created_at'][11:19]}` {label}{who}{detail}")
+
+        embed = discord.Embed(title=f"Eventos: {queue['name']}", color=discord.Color.dark_teal())
+        embed.add_field(name="Status (log)", value=f"{state['status'] or '—'}", inline=True)
+        embed.add_field(name="Status (tabela)", value=queue['status'], inline=True)
+        embed.add_field(name="Jogadores", value=f"{len(state['players'])}/{queue['slots']}", inline=True)
+        if state['reason']:
+            embed.add_field(name="Motivo", value=state['reason'], inline=False)
+        embed.add_field(name="Últimos eventos", value="\n".join(lines) or "Sem eventos registrados", inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
     async def handle_join(self, interaction: discord.Interaction, queue_id: int):
-        queue = await db_manager.get_queue(queue_id)
-        if not queue or queue['status'] != 'aberta':
+        queue = await self._resolve_target_queue(await db_manager.get_queue(queue_id))
+        if not queue:
             await interaction.response.send_message("❌ Esta fila não está mais ativa.", ephemeral=True)
             return
 
@@ -140,13 +220,36 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             await interaction.response.send_message("❌ Você precisa se registrar primeiro com `/registrar`.", ephemeral=True)
             return
 
-        added = await db_manager.add_player_to_queue(queue_id, interaction.user.id)
+        target_id = queue['id']
+        players = await db_manager.get_queue_players(target_id)
+        if interaction.user.id in players:
+            self._touch_player_timer(target_id, interaction.user.id)
+            await interaction.response.send_message("⚠️ Você já está participando desta fila. Sua presença foi renovada.", ephemeral=True)
+            return
+
+        if queue['status'] != 'aberta' or len(players) >= queue['slots']:
+            position = await db_manager.add_player_to_waitlist(target_id, interaction.user.id)
+            if position is None:
+                position = await db_manager.get_waitlist_position(target_id, interaction.user.id)
+                await interaction.response.send_message(f"⚠️ Você já está na lista de espera (posição {position}).", ephemeral=True)
+                return
+            await interaction.response.send_message(
+                f"📋 Fila cheia! Você está na posição **{position}** da lista de espera e entra automaticamente na próxima vaga.",
+                ephemeral=True
+            )
+            return
+
+        added = await db_manager.add_player_to_queue(target_id, interaction.user.id)
         if not added:
             await interaction.response.send_message("⚠️ Você já está participando desta fila.", ephemeral=True)
             return
 
-        players = await db_manager.get_queue_players(queue_id)
-        await self._update_queue_embed(queue, players, interaction)
+        self._touch_queue_timer(target_id)
+        self._touch_player_timer(target_id, interaction.user.id)
+        await db_manager.record_queue_metrics(queue['guild_id'], [(queue_metrics.QUEUE_JOINS, 1)])
+
+        players = await db_manager.get_queue_players(target_id)
+        await self._update_queue_embed(queue, players, interaction if target_id == queue_id else None)
         await interaction.response.send_message("✅ Você entrou na fila!", ephemeral=True)
 
         badges = self.bot.get_cog('BadgesCog')
@@ -154,29 +257,151 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             await badges.assign_queue_badge(interaction.user)
 
         if len(players) >= queue['slots']:
-            await db_manager.update_queue_status(queue_id, 'montando')
+            self._cancel_queue_timers(target_id)
+            await db_manager.update_queue_status(target_id, 'montando')
             await self._finalize_queue(queue, players)
 
     async def handle_leave(self, interaction: discord.Interaction, queue_id: int):
-        queue = await db_manager.get_queue(queue_id)
-        if not queue or queue['status'] != 'aberta':
+        queue = await self._resolve_target_queue(await db_manager.get_queue(queue_id))
+        if not queue:
             await interaction.response.send_message("❌ Esta fila não está mais ativa.", ephemeral=True)
             return
 
-        removed = await db_manager.remove_player_from_queue(queue_id, interaction.user.id)
+        target_id = queue['id']
+        if await db_manager.remove_player_from_waitlist(target_id, interaction.user.id):
+            await interaction.response.send_message("🚪 Você saiu da lista de espera.", ephemeral=True)
+            return
+
+        if queue['status'] != 'aberta':
+            await interaction.response.send_message("⚠️ Os times desta fila já estão sendo montados.", ephemeral=True)
+            return
+
+        removed = await db_manager.remove_player_from_queue(target_id, interaction.user.id)
         if not removed:
             await interaction.response.send_message("⚠️ Você não estava na fila.", ephemeral=True)
             return
 
-        players = await db_manager.get_queue_players(queue_id)
-        await self._update_queue_embed(queue, players, interaction)
+        self.scheduler.cancel(('jogador', target_id, interaction.user.id))
+        self._touch_queue_timer(target_id)
+        await db_manager.record_queue_metrics(queue['guild_id'], [(queue_metrics.QUEUE_LEAVES, 1)])
+
+        players = await db_manager.get_queue_players(target_id)
+        await self._update_queue_embed(queue, players, interaction if target_id == queue_id else None)
         await interaction.response.send_message("🚪 Você saiu da fila.", ephemeral=True)
 
         badges = self.bot.get_cog('BadgesCog')
         if badges:
             await badges.assign_queue_badge(interaction.user, remove=True)
 
-    async def _build_queue_embed(self, queue: dict, players: List[int]):
+        await self._backfill_from_waitlist(queue)
+
+    async def _resolve_target_queue(self, queue: Optional[dict]) -> Optional[dict]:
+        """Encaminha cliques de instâncias já encerradas para a instância viva da mesma fila."""
+        if not queue:
+            return None
+        if queue['status'] in ('aberta', 'montando'):
+            return queue
+        if queue['status'] == 'concluida':
+            latest = await db_manager.get_queue_by_name(queue['guild_id'], queue.get('base_name') or queue['name'])
+            if latest and latest['status'] in ('aberta', 'montando'):
+                return latest
+        return None
+
+    async def _open_queue_instance(
+        self,
+        guild_id: int,
+        channel: discord.abc.Messageable,
+        base_name: str,
+        mode: str,
+        slots: int,
+        created_by: int
+    ) -> dict:
+        instance = await db_manager.get_next_queue_instance(guild_id, base_name)
+        name = base_name if instance == 1 else f"{base_name} #{instance}"
+        queue_id = await db_manager.create_queue(
+            guild_id=guild_id,
+            channel_id=channel.id,
+            message_id=0,
+            name=name,
+            mode=mode,
+            slots=slots,
+            created_by=created_by,
+            base_name=base_name,
+            instance=instance
+        )
+        queue = {
+            'id': queue_id,
+            'name': name,
+            'base_name': base_name,
+            'mode': mode,
+            'slots': slots,
+            'guild_id': guild_id,
+            'channel_id': channel.id,
+            'created_by': created_by,
+            'created_at': datetime.utcnow().isoformat(sep=' ', timespec='seconds'),
+            'status': 'aberta'
+        }
+        view = QueueView(self, queue_id)
+        embed = await self._build_queue_embed(queue, [])
+        message = await channel.send(embed=embed, view=view)
+        self.bot.add_view(view, message_id=message.id)
+        await db_manager.update_queue_message(queue_id, message.id)
+        queue['message_id'] = message.id
+        self._touch_queue_timer(queue_id)
+        return queue
+
+    async def _open_next_instance(self, queue: dict) -> Optional[dict]:
+        """Abre a próxima instância da fila e promove a lista de espera para ela."""
+        channel = self._get_queue_channel(queue)
+        if not channel:
+            return None
+        next_queue = await self._open_queue_instance(
+            guild_id=queue['guild_id'],
+            channel=channel,
+            base_name=queue.get('base_name') or queue['name'],
+            mode=queue['mode'],
+            slots=queue['slots'],
+            created_by=queue['created_by']
+        )
+        await self._promote_waitlist(queue['id'], next_queue)
+        return next_queue
+
+    async def _backfill_from_waitlist(self, queue: dict):
+        players = await db_manager.get_queue_players(queue['id'])
+        free = queue['slots'] - len(players)
+        if free > 0:
+            await self._promote_waitlist(queue['id'], queue)
+
+    async def _promote_waitlist(self, source_queue_id: int, queue: dict):
+        players = await db_manager.get_queue_players(queue['id'])
+        promoted = await db_manager.promote_waitlist(source_queue_id, queue['id'], queue['slots'] - len(players))
+        if not promoted:
+            return
+        await db_manager.increment_metadata_counter('queue_waitlist_promoted')
+        self._touch_queue_timer(queue['id'])
+        for pid in promoted:
+            self._touch_player_timer(queue['id'], pid)
+        players = await db_manager.get_queue_players(queue['id'])
+        await self._update_queue_embed(queue, players, None)
+
+        guild = self.bot.get_guild(queue['guild_id'])
+        badges = self.bot.get_cog('BadgesCog')
+        if guild and badges:
+            await badges.assign_queue_badges(guild, promoted)
+
+        channel = self._get_queue_channel(queue)
+        if channel:
+            await channel.send(
+                f"🎟️ Promovidos da lista de espera para `{queue['name']}`: " +
+                ", ".join(f"<@{pid}>" for pid in promoted)
+            )
+
+        if len(players) >= queue['slots']:
+            self._cancel_queue_timers(queue['id'])
+            await db_manager.update_queue_status(queue['id'], 'montando')
+            await self._finalize_queue(queue, players)
+
+    async def _build_queue_embed(self, queue: dict, players: List[int], waitlist: Optional[List[int]] = None):
         embed = discord.Embed(
             title=f"Fila: {queue['name']}",
             color=discord.Color.blurple()
@@ -188,11 +413,18 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             value="\n".join([f"{idx+1}. <@{pid}>" for idx, pid in enumerate(players)]) or "Sem jogadores",
             inline=False
         )
+        if waitlist:
+            embed.add_field(
+                name=f"Lista de espera ({len(waitlist)})",
+                value="\n".join([f"{idx+1}. <@{pid}>" for idx, pid in enumerate(waitlist[:10])]),
+                inline=False
+            )
         embed.set_footer(text="Fila automática - Clique nos botões para participar")
         return embed
 
     async def _update_queue_embed(self, queue: dict, players: List[int], interaction: discord.Interaction | None):
-        embed = await self._build_queue_embed(queue, players)
+        waitlist = await db_manager.get_waitlist(queue['id'])
+        embed = await self._build_queue_embed(queue, players, waitlist)
         view = QueueView(self, queue['id'])
         target_message = None
         if interaction and interaction.message:
@@ -204,10 +436,12 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             self.bot.add_view(view, message_id=target_message.id)
 
     async def _finalize_queue(self, queue: dict, players: List[int]):
+        started = time.perf_counter()
+        fill_seconds = (datetime.utcnow() - _parse_timestamp(queue.get('created_at'))).total_seconds()
         guild = self.bot.get_guild(queue['guild_id'])
         channel = guild.get_channel(queue['channel_id']) if guild else None
         if not guild or not channel:
-            await db_manager.update_queue_status(queue['id'], 'erro')
+            await db_manager.update_queue_status(queue['id'], 'erro', reason='guild ou canal indisponível')
             print(f"❌ Não foi possível localizar guild ou canal para fila {queue['name']}")
             return
 
@@ -234,7 +468,9 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
             players_data.append({'user': member, 'data': player_data, 'balance_score': balance_score})
 
         if members_missing:
-            await db_manager.update_queue_status(queue['id'], 'aberta')
+            await db_manager.update_queue_status(
+                queue['id'], 'aberta', reason='jogadores indisponíveis: ' + ', '.join(str(pid) for pid in members_missing)
+            )
             for pid in members_missing:
                 await db_manager.remove_player_from_queue(queue['id'], pid)
             players = await db_manager.get_queue_players(queue['id'])
@@ -243,13 +479,17 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
                 ", ".join([f"<@{pid}>" for pid in members_missing])
             )
             await self._update_queue_embed(queue, players, None)
+            await self._restore_timers(await db_manager.get_queue(queue['id']) or queue)
+            await self._backfill_from_waitlist(queue)
             return
 
         team_cog = self.bot.get_cog('TeamCog')
+        balance_started = time.perf_counter()
         if team_cog:
             blue_team, red_team = team_cog._balance_teams(players_data)
         else:
             blue_team, red_team = self._balance_teams_local(players_data)
+        balance_ms = (time.perf_counter() - balance_started) * 1000
         blue_avg = sum(p['balance_score'] for p in blue_team) / len(blue_team)
         red_avg = sum(p['balance_score'] for p in red_team) / len(red_team)
         difference = abs(blue_avg - red_avg)
@@ -296,9 +536,80 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
 
         await db_manager.update_queue_status(queue['id'], 'concluida')
         await db_manager.increment_metadata_counter('queues_completed')
-        await self._edit_queue_message(queue, "✅ Fila concluída! Times montados no canal.", discord.Color.dark_green(), None)
+        await db_manager.record_queue_metrics(queue['guild_id'], [
+            (queue_metrics.TIME_TO_FILL, fill_seconds),
+            (queue_metrics.TIME_TO_FINALIZE, (time.perf_counter() - started) * 1000),
+            (queue_metrics.BALANCER_LATENCY, balance_ms),
+            (queue_metrics.QUEUES_COMPLETED, 1),
+        ])
+        next_queue = await self._open_next_instance(queue)
+        status_text = "✅ Fila concluída! Times montados no canal."
+        if next_queue:
+            status_text += f"\nPróxima fila: `{next_queue['name']}`"
+        await self._edit_queue_message(queue, status_text, discord.Color.dark_green(), None)
         print(f"📈 Fila {queue['name']} concluída com sucesso")
 
+    async def _on_timer(self, key: tuple):
+        if key[0] == 'fila':
+            await self._handle_idle_timeout(key[1])
+        elif key[0] == 'jogador':
+            await self._handle_player_timeout(key[1], key[2])
+
+    async def _handle_idle_timeout(self, queue_id: int):
+        queue = await db_manager.get_queue(queue_id)
+        if not queue or queue['status'] != 'aberta':
+            return
+        players = await db_manager.get_queue_players(queue_id)
+        self._cancel_queue_timers(queue_id)
+
+        if len(players) >= QUEUE_AUTOSTART_MIN_PLAYERS:
+            # Inicia com o maior número par de jogadores; quem sobra vai para o topo da lista de espera
+            starting = players[:len(players) - len(players) % 2]
+            leftovers = players[len(starting):]
+            for pid in leftovers:
+                await db_manager.remove_player_from_queue(queue_id, pid)
+                await db_manager.add_player_to_waitlist(queue_id, pid, front=True)
+            await self._cleanup_queue_badges(queue, leftovers)
+            await db_manager.update_queue_status(queue_id, 'montando', reason='início automático por inatividade')
+            await db_manager.increment_metadata_counter('queues_autostarted')
+            channel = self._get_queue_channel(queue)
+            if channel:
+                notice = f"⏱️ Fila `{queue['name']}` parada há {QUEUE_IDLE_TIMEOUT_MINUTES} min: iniciando com {len(starting)} jogadores."
+                if leftovers:
+                    notice += " Primeiros na próxima: " + ", ".join(f"<@{pid}>" for pid in leftovers)
+                await channel.send(notice)
+            await self._finalize_queue(queue, starting)
+            return
+
+        await self._cleanup_queue_badges(queue, players)
+        await db_manager.update_queue_status(queue_id, 'expirada', reason=f'{len(players)} jogadores após {QUEUE_IDLE_TIMEOUT_MINUTES} min')
+        await db_manager.increment_metadata_counter('queues_expired')
+        await self._edit_queue_message(queue, "⌛ Fila encerrada por inatividade", discord.Color.dark_grey(), None)
+        print(f"⌛ Fila {queue['name']} expirada por inatividade")
+
+    async def _handle_player_timeout(self, queue_id: int, discord_id: int):
+        queue = await db_manager.get_queue(queue_id)
+        if not queue or queue['status'] != 'aberta':
+            return
+        if not await db_manager.remove_player_from_queue(queue_id, discord_id, event_code=queue_events.PLAYER_EXPIRED):
+            return
+        await db_manager.increment_metadata_counter('queue_players_expired')
+        await db_manager.record_queue_metrics(queue['guild_id'], [(queue_metrics.QUEUE_LEAVES, 1)])
+        players = await db_manager.get_queue_players(queue_id)
+        await self._update_queue_embed(queue, players, None)
+        await self._cleanup_queue_badges(queue, [discord_id])
+        channel = self._get_queue_channel(queue)
+        if channel:
+            await channel.send(
+                f"⌛ <@{discord_id}> saiu da fila `{queue['name']}` por inatividade "
+                f"({len(players)}/{queue['slots']}). Vaga aberta — clique em **Entrar**!"
+            )
+        await self._backfill_from_waitlist(queue)
+
+    def _get_queue_channel(self, queue: dict) -> Optional[discord.abc.Messageable]:
+        guild = self.bot.get_guild(queue['guild_id'])
+        return guild.get_channel(queue['channel_id']) if guild else None
+
     def _balance_teams_local(self, players_data: List[dict]) -> tuple[List[dict], List[dict]]:
         """Fallback de balanceamento caso o TeamCog não esteja carregado."""
         from itertools import combinations
@@ -361,12 +672,15 @@ class QueueCog(commands.GroupCog, group_name="fila", group_description="Gerencie
     async def _cleanup_queue_badges(self, queue: dict, players: List[int]):
         badges = self.bot.get_cog('BadgesCog')
         guild = self.bot.get_guild(queue['guild_id'])
-        if not badges or not guild:
+        if not badges or not guild or not players:
             return
-        for player_id in players:
-            member = guild.get_member(player_id)
-            if member:
-                await badges.assign_queue_badge(member, remove=True)
+        await badges.assign_queue_badges(guild, players, remove=True)
+
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    try:
+        return datetime.fromisoformat(value) if value else datetime.utcnow()
+    except ValueError:
+        return datetime.utcnow()
 
 class QueueView(discord.ui.View):
     def __init__(self, cog: QueueCog, queue_id: int):
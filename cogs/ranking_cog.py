@@ -1,7 +1,10 @@
 # cogs/ranking_cog.py
+import asyncio
 import json
+import os
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 
 import discord
 from discord import app_commands
@@ -11,9 +14,28 @@ from utils.database_manager import db_manager
 from utils.ops_logger import log_ops_event, format_exception
 import config
 
+RANKING_PAGE_SIZE = 10
+LEADERBOARD_CHOICES = [
+    app_commands.Choice(name="Taxa de vitória", value="winrate"),
+    app_commands.Choice(name="MVPs", value="mvp"),
+    app_commands.Choice(name="Bagres", value="bagre"),
+    app_commands.Choice(name="Partidas jogadas", value="partidas"),
+    app_commands.Choice(name="Sequência de vitórias atual", value="streak"),
+    app_commands.Choice(name="Maior sequência de vitórias", value="melhor_streak"),
+]
+# Guilds publicadas em paralelo por execução do publish_task
+RANKING_PUBLISH_CONCURRENCY = int(os.getenv('RANKING_PUBLISH_CONCURRENCY', '4'))
+RANKING_PUBLISH_STAGGER_SECONDS = float(os.getenv('RANKING_PUBLISH_STAGGER_SECONDS', '0.5'))
+
 class RankingCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Embeds renderizados por guild, válidos enquanto ranking_version não mudar e
+        # nenhum snapshot novo (base dos deltas) for gravado para a guild
+        self._embed_cache: Dict[int, Tuple[int, discord.Embed]] = {}
+        # Primeira página e total de jogadores por guild, com a mesma regra de validade
+        self._page_cache: Dict[int, Tuple[int, List[Dict], int]] = {}
+        self._published_versions: Dict[int, int] = {}
         self.publish_task.start()
 
     def cog_unload(self):
@@ -23,12 +45,54 @@ class RankingCog(commands.Cog):
     @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def ranking(self, interaction: discord.Interaction):
         await interaction.response.defer()
-        embed = await self._build_ranking_embed(interaction.guild, update_snapshot=False)
+        embed = await self._get_cached_embed(interaction.guild)
         if not embed:
             await interaction.followup.send("Nenhum jogador registrado ainda. Use `/registrar` para começar!")
             return
         await db_manager.increment_metadata_counter('ranking_command_used')
+        first_page, total = await self._get_cached_first_page(interaction.guild_id)
+        if total <= RANKING_PAGE_SIZE:
+            await interaction.followup.send(embed=embed)
+            return
+        view = RankingPageView(self, interaction.user.id, first_page, total)
+        view.message = await interaction.followup.send(embed=embed, view=view)
+
+    @app_commands.command(name="leaderboard", description="Mostra o top 10 de uma estatística.")
+    @app_commands.describe(
+        estatistica="Estatística usada no ranking",
+        minimo="Mínimo de partidas para entrar no ranking de taxa de vitória"
+    )
+    @app_commands.choices(estatistica=LEADERBOARD_CHOICES)
+    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
+    async def leaderboard(
+        self,
+        interaction: discord.Interaction,
+        estatistica: app_commands.Choice[str],
+        minimo: app_commands.Range[int, 1, 500] = 10
+    ):
+        await interaction.response.defer()
+        rows = await db_manager.get_leaderboard(estatistica.value, 10, guild_id=interaction.guild_id, min_games=minimo)
+        if not rows:
+            await interaction.followup.send("📭 Ainda não há dados suficientes para esse ranking.")
+            return
+        lines: List[str] = []
+        for i, row in enumerate(rows, 1):
+            rank_emoji = {1: "🥇", 2: "🥈", 3: "🥉"}.get(i, "🏅")
+            riot_name = row.get('riot_id') or row.get('username') or f"ID: {row['discord_id']}"
+            if estatistica.value == 'winrate':
+                value = f"{row['value'] * 100:.1f}% ({row['wins']}V/{row['losses']}D)"
+            else:
+                value = str(row['value'])
+            lines.append(f"{rank_emoji} #{i} **{riot_name}** - {value}")
+        embed = discord.Embed(
+            title=f"📈 Leaderboard - {estatistica.name}",
+            description="\n".join(lines),
+            color=discord.Color.purple()
+        )
+        if estatistica.value == 'winrate':
+            embed.set_footer(text=f"Mínimo de {minimo} partidas")
         await interaction.followup.send(embed=embed)
+        await db_manager.increment_metadata_counter('leaderboard_command_used')
 
     @app_commands.command(name="ranking_publicar", description="[ADMIN] Publica o ranking em um canal e mantém atualizado")
     @app_commands.describe(canal="Canal onde o ranking será publicado")
@@ -43,6 +107,7 @@ class RankingCog(commands.Cog):
             await interaction.response.send_message("⚠️ Escolha um canal do mesmo servidor.", ephemeral=True)
             return
         await interaction.response.defer(ephemeral=True)
+        version = await db_manager.get_ranking_version()
         embed = await self._build_ranking_embed(interaction.guild, update_snapshot=True)
         if not embed:
             await interaction.followup.send("Nenhum jogador registrado ainda.", ephemeral=True)
@@ -70,45 +135,109 @@ class RankingCog(commands.Cog):
             return
         await db_manager.set_metadata(f'ranking_channel_{interaction.guild_id}', str(canal.id))
         await db_manager.set_metadata(f'ranking_message_{interaction.guild_id}', str(message.id))
+        self._published_versions[interaction.guild_id] = version
         await interaction.followup.send(f"✅ Ranking publicado em {canal.mention}.", ephemeral=True)
 
     @tasks.loop(hours=1)
     async def publish_task(self):
         await self.bot.wait_until_ready()
-        for guild in self.bot.guilds:
-            channel_id = await db_manager.get_metadata(f'ranking_channel_{guild.id}')
-            message_id = await db_manager.get_metadata(f'ranking_message_{guild.id}')
-            if not channel_id or not message_id:
-                continue
-            channel = guild.get_channel(int(channel_id))
-            if not channel:
-                continue
-            try:
-                message = await channel.fetch_message(int(message_id))
-            except Exception:
-                message = None
-            embed = await self._build_ranking_embed(guild, update_snapshot=True)
-            if not embed:
-                continue
-            if message:
-                await message.edit(embed=embed)
-            else:
-                new_message = await channel.send(embed=embed)
-                await db_manager.set_metadata(f'ranking_message_{guild.id}', str(new_message.id))
-            await db_manager.increment_metadata_counter('ranking_embeds_updated')
+        started = time.perf_counter()
+        version = await db_manager.get_ranking_version()
+        semaphore = asyncio.Semaphore(RANKING_PUBLISH_CONCURRENCY)
+        pending = [guild for guild in self.bot.guilds if self._published_versions.get(guild.id) != version]
+
+        async def run(guild: discord.Guild) -> Tuple[str, float]:
+            async with semaphore:
+                guild_started = time.perf_counter()
+                try:
+                    status = await self._publish_guild(guild, version)
+                except Exception as exc:
+                    # Falha isolada: as outras guilds seguem e esta tenta de novo no próximo ciclo
+                    status = 'erro'
+                    await log_ops_event(
+                        event='ranking.publish_failed',
+                        guild_id=guild.id,
+                        details={'version': version},
+                        stacktrace=format_exception(exc)
+                    )
+                elapsed_ms = (time.perf_counter() - guild_started) * 1000
+                if status == 'publicado':
+                    # Espaça as edições de cada worker para não esgotar o bucket de mensagens
+                    await asyncio.sleep(RANKING_PUBLISH_STAGGER_SECONDS)
+                return status, elapsed_ms
+
+        results = await asyncio.gather(*(run(guild) for guild in pending))
+        summary = {
+            'version': version,
+            'guilds': len(self.bot.guilds),
+            'pending': len(pending),
+            'publicado': sum(1 for status, _ in results if status == 'publicado'),
+            'ignorado': sum(1 for status, _ in results if status == 'ignorado'),
+            'erro': sum(1 for status, _ in results if status == 'erro'),
+            'slowest_ms': round(max((elapsed for _, elapsed in results), default=0.0), 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'finished_at': datetime.utcnow().isoformat(),
+        }
+        await db_manager.set_metadata('ranking_publish_last_run', json.dumps(summary))
+        if pending:
+            print(
+                f"📊 Ranking publicado: {summary['publicado']}/{len(pending)} guilds "
+                f"({summary['erro']} erros) em {summary['total_ms']:.0f}ms"
+            )
+
+    async def _publish_guild(self, guild: discord.Guild, version: int) -> str:
+        """Atualiza o embed fixado da guild; retorna 'publicado' ou 'ignorado'."""
+        channel_id = await db_manager.get_metadata(f'ranking_channel_{guild.id}')
+        message_id = await db_manager.get_metadata(f'ranking_message_{guild.id}')
+        if not channel_id or not message_id:
+            return 'ignorado'
+        channel = guild.get_channel(int(channel_id))
+        if not channel:
+            return 'ignorado'
+        embed = await self._build_ranking_embed(guild, update_snapshot=True)
+        if not embed:
+            return 'ignorado'
+        try:
+            # Edita direto pelo ID (sem fetch_message): uma chamada à API por guild
+            await channel.get_partial_message(int(message_id)).edit(embed=embed)
+        except discord.NotFound:
+            new_message = await channel.send(embed=embed)
+            await db_manager.set_metadata(f'ranking_message_{guild.id}', str(new_message.id))
+        self._published_versions[guild.id] = version
+        await db_manager.increment_metadata_counter('ranking_embeds_updated')
+        return 'publicado'
 
     @publish_task.before_loop
     async def before_publish_task(self):
         await self.bot.wait_until_ready()
 
+    async def _get_cached_embed(self, guild: Optional[discord.Guild]) -> Optional[discord.Embed]:
+        key = guild.id if guild else 0
+        version = await db_manager.get_ranking_version()
+        cached = self._embed_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        embed = await self._build_ranking_embed(guild, update_snapshot=False)
+        if embed:
+            self._embed_cache[key] = (version, embed)
+        return embed
+
+    async def _get_cached_first_page(self, guild_id: Optional[int]) -> Tuple[List[Dict], int]:
+        key = guild_id or 0
+        version = await db_manager.get_ranking_version()
+        cached = self._page_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        first_page = await db_manager.get_ranking_page(RANKING_PAGE_SIZE, guild_id=guild_id)
+        total = await db_manager.count_ranking_players(guild_id)
+        self._page_cache[key] = (version, first_page, total)
+        return first_page, total
+
     async def _build_ranking_embed(self, guild: Optional[discord.Guild], update_snapshot: bool) -> Optional[discord.Embed]:
-        players = await db_manager.get_ranking_snapshot(10)
+        guild_key = guild.id if guild else 0
+        players = await db_manager.get_ranking_with_deltas(guild_key, 10)
         if not players:
             return None
-        key = f'ranking_snapshot_{guild.id if guild else 0}'
-        prev_snapshot = await db_manager.get_metadata(key)
-        prev_map = json.loads(prev_snapshot) if prev_snapshot else {}
-        snapshot_map = {}
 
         embed = discord.Embed(
             title="🏆 Ranking de PDL - ARAM Scrim Master 🏆",
@@ -119,11 +248,8 @@ class RankingCog(commands.Cog):
             rank_emoji = {1: "🥇", 2: "🥈", 3: "🥉"}.get(i, "🏅")
             riot_name = player.get('riot_id') or player.get('username') or f"ID: {player['discord_id']}"
             elo_info = config.get_elo_by_pdl(player['pdl'])
-            prev_pdl = prev_map.get(str(player['discord_id']), player['pdl'])
-            delta = player['pdl'] - prev_pdl
-            snapshot_map[str(player['discord_id'])] = player['pdl']
             lines.append(
-                f"{rank_emoji} #{i} {elo_info['emoji']} **{riot_name}** - {player['pdl']} PDL ({delta:+d})"
+                f"{rank_emoji} #{i} {elo_info['emoji']} **{riot_name}** - {player['pdl']} PDL ({player['pdl_delta']:+d})"
             )
 
         embed.description = "\n".join(lines)
@@ -131,9 +257,86 @@ class RankingCog(commands.Cog):
         embed.set_footer(text=f"Atualizado em {timestamp}")
 
         if update_snapshot:
-            await db_manager.set_metadata(key, json.dumps(snapshot_map))
-            await db_manager.set_metadata(f'ranking_last_update_{guild.id if guild else 0}', datetime.utcnow().isoformat())
+            await db_manager.create_ranking_snapshot(guild_key)
+            # O novo snapshot muda os deltas sem mudar ranking_version: o embed em cache ficou velho
+            self._embed_cache.pop(guild_key, None)
+            await db_manager.set_metadata(f'ranking_last_update_{guild_key}', datetime.utcnow().isoformat())
         return embed
 
+    def build_page_embed(self, players: List[Dict], start: int, total: int) -> discord.Embed:
+        embed = discord.Embed(
+            title="🏆 Ranking de PDL - ARAM Scrim Master 🏆",
+            color=discord.Color.purple()
+        )
+        lines: List[str] = []
+        for i, player in enumerate(players, start):
+            riot_name = player.get('riot_id') or player.get('username') or f"ID: {player['discord_id']}"
+            elo_info = config.get_elo_by_pdl(player['pdl'])
+            lines.append(f"🏅 #{i} {elo_info['emoji']} **{riot_name}** - {player['pdl']} PDL")
+        embed.description = "\n".join(lines)
+        page = (start - 1) // RANKING_PAGE_SIZE + 1
+        pages = (total + RANKING_PAGE_SIZE - 1) // RANKING_PAGE_SIZE
+        embed.set_footer(text=f"Página {page}/{pages} • {total} jogadores")
+        return embed
+
+class RankingPageView(discord.ui.View):
+    """Navegação do /ranking; cada clique busca só a página vizinha pelo keyset."""
+
+    def __init__(self, cog: RankingCog, author_id: int, players: List[Dict], total: int):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.author_id = author_id
+        self.players = players
+        self.start = 1
+        self.total = total
+        self.message: Optional[discord.Message] = None
+        self._sync_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Use `/ranking` para navegar no seu próprio ranking.", ephemeral=True)
+            return False
+        return True
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.start <= 1
+        self.next_page.disabled = self.start + len(self.players) > self.total or len(self.players) < RANKING_PAGE_SIZE
+
+    @staticmethod
+    def _key(player: Dict) -> tuple:
+        return (player['pdl'], player['discord_id'])
+
+    async def _show(self, interaction: discord.Interaction, players: List[Dict], start: int):
+        if not players:
+            await interaction.response.send_message("Não há mais jogadores nessa direção.", ephemeral=True)
+            return
+        self.players = players
+        self.start = max(1, start)
+        self._sync_buttons()
+        if self.start == 1:
+            embed = await self.cog._get_cached_embed(interaction.guild) or self.cog.build_page_embed(players, 1, self.total)
+        else:
+            embed = self.cog.build_page_embed(players, self.start, self.total)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀️ Anterior", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        players = await db_manager.get_ranking_page(RANKING_PAGE_SIZE, before=self._key(self.players[0]), guild_id=interaction.guild_id)
+        await self._show(interaction, players, self.start - len(players))
+
+    @discord.ui.button(label="Próxima ▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        players = await db_manager.get_ranking_page(RANKING_PAGE_SIZE, after=self._key(self.players[-1]), guild_id=interaction.guild_id)
+        await self._show(interaction, players, self.start + len(self.players))
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(RankingCog(bot))
@@ -1,7 +1,7 @@
-import json
 import asyncio
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 import discord
 from discord import app_commands
@@ -9,11 +9,17 @@ from discord.ext import commands
 
 from utils.database_manager import db_manager
 from utils.backup_transport import send_backup_file
-from backup_restore_db import backup_database
+from backup_restore_db import export_database_ndjson
+
+SEASON_RANKING_LIMIT = 15
+# Máximo de embeds de temporadas mantidos em memória (LRU)
+SEASON_EMBED_CACHE_SIZE = 64
 
 class SeasonCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Embeds de temporadas passadas por chave, válidos enquanto season_history_version não mudar
+        self._embed_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
 
     @app_commands.command(name="temporada_iniciar", description="[ADMIN] Inicia nova temporada com reset de PDL.")
     @app_commands.describe(nome="Nome da temporada", canal="Canal para anunciar o reset")
@@ -52,27 +58,108 @@ class SeasonCog(commands.Cog):
         )
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-    async def _start_season(self, interaction: discord.Interaction, nome: str, channel: discord.TextChannel):
-        players = await db_manager.get_full_ranking()
+    @app_commands.command(name="temporada_ranking", description="Mostra o ranking final de uma temporada anterior.")
+    @app_commands.describe(nome="Nome da temporada")
+    @app_commands.checks.cooldown(1, 5.0, key=lambda i: (i.guild_id, i.user.id))
+    async def temporada_ranking(self, interaction: discord.Interaction, nome: str):
+        embed = await self._cached_embed(('ranking', nome), lambda: self._build_season_ranking_embed(nome))
+        if not embed:
+            await interaction.response.send_message("❌ Temporada não encontrada.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=embed)
+
+    @temporada_ranking.autocomplete('nome')
+    async def temporada_ranking_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        seasons = await db_manager.list_seasons()
+        return [
+            app_commands.Choice(name=season['season_name'], value=season['season_name'])
+            for season in seasons
+            if current.lower() in season['season_name'].lower()
+        ][:25]
+
+    @app_commands.command(name="temporada_comparar", description="Compara o desempenho de um jogador entre temporadas.")
+    @app_commands.describe(jogador="Jogador alvo (opcional)")
+    @app_commands.checks.cooldown(1, 5.0, key=lambda i: (i.guild_id, i.user.id))
+    async def temporada_comparar(self, interaction: discord.Interaction, jogador: Optional[discord.Member] = None):
+        target = jogador or interaction.user
+        embed = await self._cached_embed(('player', target.id), lambda: self._build_player_seasons_embed(target))
+        if not embed:
+            await interaction.response.send_message("📭 Este jogador não aparece em nenhuma temporada encerrada.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=embed)
+
+    async def _cached_embed(self, key: tuple, builder) -> Optional[discord.Embed]:
+        version = await db_manager.get_season_history_version()
+        cached = self._embed_cache.get(key)
+        if cached and cached[0] == version:
+            self._embed_cache.move_to_end(key)
+            return cached[1]
+        embed = await builder()
+        if embed:
+            self._embed_cache[key] = (version, embed)
+            self._embed_cache.move_to_end(key)
+            while len(self._embed_cache) > SEASON_EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+        return embed
+
+    async def _build_season_ranking_embed(self, season_name: str) -> Optional[discord.Embed]:
+        players = await db_manager.get_season_ranking(season_name, SEASON_RANKING_LIMIT)
         if not players:
+            return None
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        lines = []
+        for player in players:
+            marker = medals.get(player['position'], f"`{player['position']:>2}.`")
+            name = player.get('riot_id') or f"<@{player['discord_id']}>"
+            lines.append(f"{marker} {name} • **{player['pdl']}** PDL ({player['wins']}V/{player['losses']}D)")
+        embed = discord.Embed(
+            title=f"🏆 Temporada {season_name}",
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Snapshot salvo em {str(players[0]['snapshot_at'])[:16]}")
+        return embed
+
+    async def _build_player_seasons_embed(self, member: discord.Member) -> Optional[discord.Embed]:
+        seasons = await db_manager.get_player_seasons(member.id)
+        if not seasons:
+            return None
+        embed = discord.Embed(title=f"📈 Temporadas de {member.display_name}", color=discord.Color.gold())
+        previous = None
+        for season in seasons[-10:]:
+            games = season['wins'] + season['losses']
+            win_rate = season['wins'] / games * 100 if games else 0
+            delta = f" ({season['pdl'] - previous['pdl']:+} PDL)" if previous else ""
+            embed.add_field(
+                name=season['season_name'],
+                value=(
+                    f"#{season['position']} de {season['players']} • {season['pdl']} PDL{delta}\n"
+                    f"{season['wins']}V/{season['losses']}D ({win_rate:.0f}%) • ⭐ {season['mvp_count']} • 💩 {season['bagre_count']}"
+                ),
+                inline=False
+            )
+            previous = season
+        best = min(seasons, key=lambda season: season['position'])
+        embed.set_footer(text=f"Melhor colocação: #{best['position']} em {best['season_name']}")
+        return embed
+
+    async def _start_season(self, interaction: discord.Interaction, nome: str, channel: discord.TextChannel):
+        if not await db_manager.count_players():
             await interaction.followup.send("📭 Nenhum jogador registrado para reset.", ephemeral=True)
             return
-        await self._ensure_backup(players, nome, stage="inicio")
-        await db_manager.save_season_history(nome, players)
-        await db_manager.bulk_reset_player_stats()
+        await self._ensure_backup(nome, stage="inicio")
         now = datetime.utcnow().isoformat()
-        await db_manager.set_metadata('season_active', '1')
-        await db_manager.set_metadata('season_name', nome)
-        await db_manager.set_metadata('season_started_at', now)
-        await db_manager.set_metadata('season_started_by', str(interaction.user.id))
-        await db_manager.set_metadata('season_locked', '0')
-        await db_manager.increment_metadata_counter('seasons_started')
+        result = await db_manager.rollover_season(nome, now, interaction.user.id)
+        if not result:
+            await interaction.followup.send("❌ Não foi possível iniciar a temporada (já ativa ou erro no banco). Nada foi alterado.", ephemeral=True)
+            return
+        print(f"🗄️ {result['archived']} participações da temporada {result['previous_season']} arquivadas")
         embed = discord.Embed(
             title=f"🏁 Nova temporada: {nome}",
             description="Ranking resetado! Registre partidas para subir novamente.",
             color=discord.Color.green()
         )
-        embed.add_field(name="Participantes", value=str(len(players)), inline=True)
+        embed.add_field(name="Participantes", value=str(result['players']), inline=True)
         embed.add_field(name="Iniciado por", value=interaction.user.mention, inline=True)
         embed.set_footer(text="Boa sorte na nova temporada!")
         await channel.send(
@@ -82,8 +169,7 @@ class SeasonCog(commands.Cog):
         await interaction.followup.send("✅ Temporada iniciada com sucesso!", ephemeral=True)
 
     async def _finish_season(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        players = await db_manager.get_full_ranking()
-        await self._ensure_backup(players, await db_manager.get_metadata('season_name') or 'Final', stage="final")
+        await self._ensure_backup(await db_manager.get_metadata('season_name') or 'Final', stage="final")
         now = datetime.utcnow().isoformat()
         await db_manager.set_metadata('season_active', '0')
         await db_manager.set_metadata('season_locked', '1')
@@ -99,23 +185,20 @@ class SeasonCog(commands.Cog):
         await channel.send(embed=embed)
         await interaction.followup.send("✅ Temporada encerrada e ranking congelado.", ephemeral=True)
 
-    async def _ensure_backup(self, players: list, season_name: str, stage: str):
+    async def _ensure_backup(self, season_name: str, stage: str):
+        """Exporta o banco uma única vez (NDJSON comprimido) e envia o mesmo arquivo como backup da temporada."""
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         safe_name = season_name.replace(' ', '_')
-        filename = f"season_{safe_name}_{stage}_{timestamp}.json"
-        payload = {
+        filename = f"season_{safe_name}_{stage}_{timestamp}.ndjson.gz"
+        exported = await export_database_ndjson(filename, header={
             'season': season_name,
             'stage': stage,
-            'timestamp': timestamp,
-            'players': players
-        }
-        with open(filename, 'w', encoding='utf-8') as fp:
-            json.dump(payload, fp, ensure_ascii=False, indent=2)
-        await send_backup_file(filename, description=f"Temporada {season_name} ({stage})")
-        try:
-            await backup_database(f"backup_{safe_name}_{stage}_{timestamp}.json")
-        except Exception as exc:
-            print(f"⚠️ Falha ao gerar backup adicional: {exc}")
+            'timestamp': timestamp
+        })
+        if not exported:
+            print(f"⚠️ Falha ao exportar backup da temporada {season_name} ({stage})")
+            return
+        await send_backup_file(exported, description=f"Temporada {season_name} ({stage})")
 
 class SeasonConfirmView(discord.ui.View):
     def __init__(self, cog: SeasonCog, action: str, nome: Optional[str], channel: discord.TextChannel, author: discord.Member):
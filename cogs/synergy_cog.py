@@ -0,0 +1,72 @@
+# cogs/synergy_cog.py
+from typing import List, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.database_manager import db_manager
+
+class SynergyCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="sinergia", description="Mostra com quem você mais vence e contra quem mais perde.")
+    @app_commands.describe(
+        jogador="Jogador alvo (opcional)",
+        minimo="Mínimo de partidas juntos/contra para considerar (padrão 3)"
+    )
+    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
+    async def sinergia(
+        self,
+        interaction: discord.Interaction,
+        jogador: Optional[discord.Member] = None,
+        minimo: app_commands.Range[int, 1, 50] = 3
+    ):
+        target = jogador or interaction.user
+        player_data = await db_manager.get_player(target.id)
+        if not player_data:
+            await interaction.response.send_message("❌ Jogador não registrado.", ephemeral=True)
+            return
+
+        await interaction.response.defer()
+        best_duos = await db_manager.get_pair_stats(target.id, 'dupla', minimo, best=True)
+        worst_duos = await db_manager.get_pair_stats(target.id, 'dupla', minimo, best=False)
+        nemesis = await db_manager.get_pair_stats(target.id, 'rival', minimo, best=False)
+        victims = await db_manager.get_pair_stats(target.id, 'rival', minimo, best=True)
+        if not best_duos and not nemesis:
+            await interaction.followup.send(
+                f"📭 Ainda não há partidas suficientes (mínimo {minimo}) com os mesmos jogadores.",
+                ephemeral=True
+            )
+            return
+
+        # Só chama de nêmesis/freguês/dupla ruim quem realmente está abaixo ou acima de 50%
+        worst_duos = [row for row in worst_duos if row['win_rate'] < 0.5]
+        nemesis = [row for row in nemesis if row['win_rate'] < 0.5]
+        victims = [row for row in victims if row['win_rate'] > 0.5]
+
+        embed = discord.Embed(
+            title=f"🤝 Sinergia de {player_data.get('riot_id') or target.display_name}",
+            color=discord.Color.blurple()
+        )
+        embed.add_field(name="Melhores duplas", value=self._format_rows(best_duos), inline=False)
+        embed.add_field(name="Duplas a evitar", value=self._format_rows(worst_duos), inline=False)
+        embed.add_field(name="😈 Nêmesis", value=self._format_rows(nemesis, rival=True), inline=False)
+        embed.add_field(name="🎯 Fregueses", value=self._format_rows(victims, rival=True), inline=False)
+        embed.set_footer(text=f"Considerando pares com pelo menos {minimo} partidas")
+        await interaction.followup.send(embed=embed)
+        await db_manager.increment_metadata_counter('sinergia_used')
+
+    def _format_rows(self, rows: List[dict], rival: bool = False) -> str:
+        if not rows:
+            return "Sem dados"
+        label = "contra" if rival else "juntos"
+        lines = []
+        for row in rows:
+            losses = row['games'] - row['wins']
+            lines.append(f"<@{row['other_id']}> • {row['win_rate'] * 100:.0f}% ({row['wins']}V/{losses}D {label})")
+        return "\n".join(lines)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(SynergyCog(bot))
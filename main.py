@@ -1,8 +1,11 @@
 # main.py
 import asyncio
+import hmac
 import os
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import discord
 from discord import app_commands
@@ -14,6 +17,9 @@ from aiohttp import web
 from utils.database_manager import db_manager
 from utils.backup_transport import send_backup_file
 from utils.ops_logger import log_ops_event, format_exception
+from utils.queue_metrics import summarize_histograms
+from utils.ranking_http_cache import RankingResponseCache, accepts_gzip, etag_matches
+from utils.ranking_stream import ranking_broadcaster
 
 load_dotenv()
 
@@ -229,12 +235,12 @@ async def health_check(request):
         'uptime': 'online'
     })
 
-async def public_ranking(request):
-    try:
-        limit = int(request.rel_url.query.get('limit', '20'))
-    except ValueError:
-        limit = 20
-    limit = max(1, min(limit, 50))
+ranking_response_cache = RankingResponseCache(db_manager.get_ranking_version)
+RANKING_CACHE_MAX_AGE = int(os.getenv('RANKING_CACHE_MAX_AGE', '30'))
+RANKING_HITS_FLUSH_SECONDS = 60
+_ranking_hits = {'pending': 0, 'flushed_at': 0.0}
+
+async def _build_public_ranking_payload(limit: int) -> dict:
     ranking = await db_manager.get_ranking_snapshot(limit)
     data = []
     for position, player in enumerate(ranking, 1):
@@ -250,18 +256,284 @@ async def public_ranking(request):
             'bagre_count': player.get('bagre_count', 0)
         })
     updated_at = await db_manager.get_metadata('ranking_last_update_0') or datetime.utcnow().isoformat()
-    payload = {'updated_at': updated_at, 'players': data}
-    response = web.json_response(payload)
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    await db_manager.increment_metadata_counter('ranking_endpoint_hits')
+    return {'updated_at': updated_at, 'players': data}
+
+def _count_ranking_hit():
+    """Acumula hits em memória e grava o contador no banco no máximo uma vez por minuto."""
+    _ranking_hits['pending'] += 1
+    now = time.monotonic()
+    if now - _ranking_hits['flushed_at'] >= RANKING_HITS_FLUSH_SECONDS:
+        pending, _ranking_hits['pending'] = _ranking_hits['pending'], 0
+        _ranking_hits['flushed_at'] = now
+        asyncio.create_task(db_manager.increment_metadata_counter('ranking_endpoint_hits', pending))
+
+async def public_ranking(request):
+    try:
+        limit = int(request.rel_url.query.get('limit', '20'))
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, 50))
+    entry = await ranking_response_cache.get(('ranking', limit), lambda: _build_public_ranking_payload(limit))
+    _count_ranking_hit()
+    return _cached_json_response(request, entry, RANKING_CACHE_MAX_AGE)
+
+def _cached_json_response(request, entry: dict, max_age: int):
+    """Resposta de uma entrada do RankingResponseCache com ETag/304 e gzip quando aceito."""
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag',
+        'Cache-Control': f'public, max-age={max_age}',
+        'ETag': entry['etag'],
+        'Vary': 'Accept-Encoding',
+    }
+    if etag_matches(request.headers.get('If-None-Match'), entry['etag']):
+        return web.Response(status=304, headers=headers)
+
+    body = entry['body']
+    if accepts_gzip(request.headers.get('Accept-Encoding')):
+        body = entry['gzip_body']
+        headers['Content-Encoding'] = 'gzip'
+    return web.Response(body=body, headers=headers, content_type='application/json', charset='utf-8')
+
+def _parse_ranking_cursor(raw: str):
+    """Cursor opaco da paginação: "pdl:discord_id:posição" da última linha entregue."""
+    try:
+        pdl, discord_id, position = (int(part) for part in raw.split(':'))
+    except ValueError:
+        return None
+    return (pdl, discord_id), position
+
+async def public_ranking_page(request):
+    try:
+        limit = int(request.rel_url.query.get('limit', '20'))
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, 100))
+    after, position = None, 0
+    raw_cursor = request.rel_url.query.get('cursor')
+    if raw_cursor:
+        parsed = _parse_ranking_cursor(raw_cursor)
+        if not parsed:
+            return web.json_response({'error': 'cursor inválido'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+        after, position = parsed
+
+    # Uma linha a mais só para saber se existe próxima página
+    players = await db_manager.get_ranking_page(limit + 1, after=after)
+    has_more = len(players) > limit
+    players = players[:limit]
+    data = []
+    for offset, player in enumerate(players, position + 1):
+        data.append({
+            'position': offset,
+            'discord_id': player['discord_id'],
+            'riot_id': player.get('riot_id'),
+            'lol_rank': player.get('lol_rank'),
+            'pdl': player['pdl'],
+            'wins': player['wins'],
+            'losses': player['losses']
+        })
+    next_cursor = None
+    if has_more:
+        last = players[-1]
+        next_cursor = f"{last['pdl']}:{last['discord_id']}:{position + len(players)}"
+    _count_ranking_hit()
+    return web.json_response(
+        {'players': data, 'next_cursor': next_cursor},
+        headers={'Access-Control-Allow-Origin': '*'}
+    )
+
+async def public_player_pdl_series(request):
+    """Série de PDL reduzida de um jogador para gráficos externos."""
+    try:
+        discord_id = int(request.match_info['discord_id'])
+        days = max(1, min(int(request.rel_url.query.get('days', '30')), 365))
+        points = max(2, min(int(request.rel_url.query.get('points', '100')), 500))
+    except ValueError:
+        return web.json_response({'error': 'parâmetros inválidos'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+    series = await db_manager.get_pdl_series(discord_id, days, max_points=points)
+    return web.json_response(
+        {'discord_id': discord_id, 'days': days, 'points': series},
+        headers={'Access-Control-Allow-Origin': '*'}
+    )
+
+def _parse_match_cursor(raw: str):
+    """Cursor da busca de partidas: "id:created_at" da última partida entregue."""
+    match_pk, _, created_at = raw.partition(':')
+    if not match_pk.isdigit() or not created_at:
+        return None
+    return (created_at, int(match_pk))
+
+def _public_match(match: dict) -> dict:
+    return {
+        'match_id': match['match_id'],
+        'created_at': match['created_at'],
+        'winner': match['winner'],
+        'mvp_id': match['mvp_id'],
+        'bagre_id': match['bagre_id'],
+        'duration': match['duration'],
+        'participants': match['participants'],
+    }
+
+async def public_match_search(request):
+    """Busca paginada de partidas de uma guild por jogador, vencedor e período."""
+    query = request.rel_url.query
+    try:
+        guild_id = int(query['guild_id'])
+        discord_id = int(query['player']) if 'player' in query else None
+        limit = max(1, min(int(query.get('limit', '20')), 50))
+    except (KeyError, ValueError):
+        return web.json_response({'error': 'parâmetros inválidos'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+    winner = query.get('winner')
+    if winner and winner not in ('azul', 'vermelho'):
+        return web.json_response({'error': 'winner deve ser azul ou vermelho'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+    before = None
+    if query.get('cursor'):
+        before = _parse_match_cursor(query['cursor'])
+        if not before:
+            return web.json_response({'error': 'cursor inválido'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+
+    matches = await db_manager.search_matches(
+        guild_id,
+        discord_id=discord_id,
+        winner=winner,
+        since=query.get('since'),
+        until=query.get('until'),
+        limit=limit,
+        before=before
+    )
+    next_cursor = None
+    if len(matches) > limit:
+        matches = matches[:limit]
+        next_cursor = f"{matches[-1]['id']}:{matches[-1]['created_at']}"
+    return web.json_response(
+        {'matches': [_public_match(match) for match in matches], 'next_cursor': next_cursor},
+        headers={'Access-Control-Allow-Origin': '*'}
+    )
+
+async def public_match_detail(request):
+    match = await db_manager.get_match_details(request.match_info['match_id'])
+    if not match:
+        return web.json_response({'error': 'partida não encontrada'}, status=404, headers={'Access-Control-Allow-Origin': '*'})
+    return web.json_response(_public_match(match), headers={'Access-Control-Allow-Origin': '*'})
+
+# Temporadas encerradas não mudam: o cache só é refeito quando season_history é gravada
+season_response_cache = RankingResponseCache(db_manager.get_season_history_version)
+SEASON_CACHE_MAX_AGE = int(os.getenv('SEASON_CACHE_MAX_AGE', '3600'))
+
+async def _build_public_season_payload(season_name: str) -> Optional[dict]:
+    players = await db_manager.get_season_ranking(season_name, limit=100)
+    if not players:
+        return None
+    return {
+        'season': season_name,
+        'players': [
+            {
+                'position': player['position'],
+                'discord_id': player['discord_id'],
+                'riot_id': player.get('riot_id'),
+                'pdl': player['pdl'],
+                'wins': player['wins'],
+                'losses': player['losses'],
+                'mvp_count': player['mvp_count'],
+                'bagre_count': player['bagre_count']
+            }
+            for player in players
+        ]
+    }
+
+async def _build_public_player_seasons_payload(discord_id: int) -> Optional[dict]:
+    seasons = await db_manager.get_player_seasons(discord_id)
+    if not seasons:
+        # Jogador desconhecido (ou sem temporadas): não ocupa espaço no cache
+        return None
+    return {'discord_id': discord_id, 'seasons': seasons}
+
+async def public_seasons(request):
+    async def build():
+        return {'seasons': await db_manager.list_seasons()}
+    entry = await season_response_cache.get(('seasons',), build)
+    return _cached_json_response(request, entry, SEASON_CACHE_MAX_AGE)
+
+async def public_season_ranking(request):
+    season_name = request.match_info['season_name']
+    entry = await season_response_cache.get(('season', season_name), lambda: _build_public_season_payload(season_name))
+    if not entry:
+        return web.json_response({'error': 'temporada não encontrada'}, status=404, headers={'Access-Control-Allow-Origin': '*'})
+    return _cached_json_response(request, entry, SEASON_CACHE_MAX_AGE)
+
+async def public_player_seasons(request):
+    try:
+        discord_id = int(request.match_info['discord_id'])
+    except ValueError:
+        return web.json_response({'error': 'parâmetros inválidos'}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+    entry = await season_response_cache.get(('player', discord_id), lambda: _build_public_player_seasons_payload(discord_id))
+    if not entry:
+        return web.json_response({'error': 'jogador sem temporadas registradas'}, status=404, headers={'Access-Control-Allow-Origin': '*'})
+    return _cached_json_response(request, entry, SEASON_CACHE_MAX_AGE)
+
+async def public_ranking_stream(request):
+    """Ranking ao vivo (Server-Sent Events): snapshot inicial e diffs a cada partida registrada."""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Access-Control-Allow-Origin': '*',
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    queue = await ranking_broadcaster.subscribe()
+    try:
+        async for message in ranking_broadcaster.iter_messages(queue):
+            await response.write(message)
+    except ConnectionResetError:
+        # Cliente desconectou; o cancelamento (shutdown) continua propagando
+        pass
+    finally:
+        ranking_broadcaster.unsubscribe(queue)
     return response
 
+# Token exigido pelos endpoints internos (/metrics/*); sem ele as rotas nem são registradas
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+def _metrics_authorized(request) -> bool:
+    supplied = request.headers.get('Authorization', '')
+    if supplied.startswith('Bearer '):
+        supplied = supplied[len('Bearer '):]
+    return bool(METRICS_TOKEN) and hmac.compare_digest(supplied.strip().encode(), METRICS_TOKEN.encode())
+
+async def queue_metrics_endpoint(request):
+    """Throughput das filas: histogramas de tempo e churn por guild e hora."""
+    if not _metrics_authorized(request):
+        return web.json_response({'error': 'não autorizado'}, status=401)
+    try:
+        hours = int(request.rel_url.query.get('hours', '24'))
+        guild_id = int(request.rel_url.query['guild_id']) if 'guild_id' in request.rel_url.query else None
+    except ValueError:
+        return web.json_response({'error': 'parâmetros inválidos'}, status=400)
+    hours = max(1, min(hours, 24 * 30))
+    rows = await db_manager.get_queue_histograms(hours=hours, guild_id=guild_id)
+    return web.json_response({
+        'hours': hours,
+        'guild_id': guild_id,
+        'generated_at': datetime.utcnow().isoformat(),
+        'metrics': summarize_histograms(rows)
+    })
+
 async def start_web_server():
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
     app.router.add_get('/ping', health_check)
     app.router.add_get('/public/ranking.json', public_ranking)
+    app.router.add_get('/public/ranking/page.json', public_ranking_page)
+    app.router.add_get('/public/ranking/stream', public_ranking_stream)
+    app.router.add_get('/public/players/{discord_id}/pdl.json', public_player_pdl_series)
+    app.router.add_get('/public/matches.json', public_match_search)
+    app.router.add_get('/public/seasons.json', public_seasons)
+    app.router.add_get('/public/seasons/{season_name}.json', public_season_ranking)
+    app.router.add_get('/public/players/{discord_id}/seasons.json', public_player_seasons)
+    app.router.add_get('/public/matches/{match_id}.json', public_match_detail)
+    if METRICS_TOKEN:
+        app.router.add_get('/metrics/queues.json', queue_metrics_endpoint)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -320,6 +592,7 @@ async def load_cogs():
         'queue_cog',
         'season_cog',
         'history_cog',
+        'synergy_cog',
         'fairplay_cog',
         'badges_cog',
     ]
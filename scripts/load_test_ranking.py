@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Carga simples no /public/ranking.json para medir throughput e latência."""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import aiohttp
+
+
+async def worker(session, url, count, etag, latencies, statuses):
+    headers = {'Accept-Encoding': 'gzip'}
+    if etag:
+        headers['If-None-Match'] = etag
+    for _ in range(count):
+        started = time.perf_counter()
+        async with session.get(url, headers=headers) as response:
+            await response.read()
+            statuses[response.status] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://localhost:10000/public/ranking.json')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--etag', action='store_true', help='Reenvia o ETag da primeira resposta (If-None-Match)')
+    args = parser.parse_args()
+
+    latencies = []
+    statuses = Counter()
+    async with aiohttp.ClientSession() as session:
+        etag = None
+        if args.etag:
+            async with session.get(args.url) as response:
+                etag = response.headers.get('ETag')
+        per_worker = max(1, args.requests // args.concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(session, args.url, per_worker, etag, latencies, statuses)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    print(f"Requisições: {total} em {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+    print(f"Status: {dict(statuses)}")
+    print(f"Latência p50: {percentile(latencies, 0.50):.1f}ms | p95: {percentile(latencies, 0.95):.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -22,14 +22,17 @@ async def send_backup_file(file_path: str, description: Optional[str] = None) ->
     data = aiohttp.FormData()
     message = description or "Backup automático do ARAM Bot"
     data.add_field('content', message)
-    data.add_field('file', path.read_bytes(), filename=path.name, content_type='application/json')
+    content_type = 'application/gzip' if path.suffix == '.gz' else 'application/json'
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.post(webhook_url, data=data) as response:
-            if response.status < 300:
-                print("✅ Backup enviado para o webhook com sucesso")
-                return True
-            else:
-                error_text = await response.text()
-                print(f"❌ Falha ao enviar backup: HTTP {response.status} - {error_text[:200]}")
-                return False
+    # O arquivo é enviado em streaming a partir do disco, sem carregá-lo inteiro
+    with path.open('rb') as fp:
+        data.add_field('file', fp, filename=path.name, content_type=content_type)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(webhook_url, data=data) as response:
+                if response.status < 300:
+                    print("✅ Backup enviado para o webhook com sucesso")
+                    return True
+                else:
+                    error_text = await response.text()
+                    print(f"❌ Falha ao enviar backup: HTTP {response.status} - {error_text[:200]}")
+                    return False
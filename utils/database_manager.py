@@ -3,9 +3,37 @@ import aiosqlite
 import os
 import json
 import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 import config
+from utils import queue_events, queue_metrics, rolling_stats
+
+# Colunas copiadas de match_participants para match_participants_archive
+_ARCHIVE_COLUMNS = (
+    'id, match_id, discord_id, team, champion, kills, deaths, assists, damage_dealt, '
+    'result, pdl_change, is_mvp, is_bagre, created_at'
+)
+
+# Partidas selecionadas em `page` com os participantes da temporada atual e dos arquivos.
+# Partidas sem participantes (anteriores a match_participants) aparecem uma vez, com colunas nulas.
+_MATCHES_WITH_PARTICIPANTS = '''
+    WITH page AS ({page})
+    SELECT page.*, mp.discord_id, mp.team, mp.result, mp.pdl_change, mp.is_mvp, mp.is_bagre, p.riot_id
+    FROM page
+    LEFT JOIN match_participants mp ON mp.match_id = page.match_id
+    LEFT JOIN players p ON p.discord_id = mp.discord_id
+    UNION ALL
+    SELECT page.*, mp.discord_id, mp.team, mp.result, mp.pdl_change, mp.is_mvp, mp.is_bagre, p.riot_id
+    FROM page
+    JOIN match_participants_archive mp ON mp.match_id = page.match_id
+    LEFT JOIN players p ON p.discord_id = mp.discord_id
+    ORDER BY {order}
+'''
+
+# Colunas de partida e de participante devolvidas por get_match_details/search_matches
+_MATCH_FIELDS = ('id', 'match_id', 'guild_id', 'winner', 'mvp_id', 'bagre_id', 'duration', 'created_at')
+_PARTICIPANT_FIELDS = ('discord_id', 'team', 'result', 'pdl_change', 'is_mvp', 'is_bagre', 'riot_id')
 
 class DatabaseManager:
     def __init__(self, db_path: str = None):
@@ -122,6 +150,9 @@ class DatabaseManager:
                     status TEXT NOT NULL DEFAULT 'aberta',
                     created_by INTEGER NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_activity_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    base_name TEXT,
+                    instance INTEGER DEFAULT 1,
                     UNIQUE(guild_id, name)
                 )
             ''')
@@ -137,6 +168,46 @@ class DatabaseManager:
                 )
             ''')
 
+            # Lista de espera (overflow) das filas, ordenada por posição
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS queue_waitlist (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue_id INTEGER NOT NULL,
+                    discord_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(queue_id, discord_id),
+                    FOREIGN KEY(queue_id) REFERENCES queues(id) ON DELETE CASCADE
+                )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_queue_waitlist_position ON queue_waitlist(queue_id, position)')
+
+            # Log append-only do ciclo de vida das filas (códigos em utils/queue_events.py)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS queue_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue_id INTEGER NOT NULL,
+                    code INTEGER NOT NULL,
+                    discord_id INTEGER,
+                    detail TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_queue_events_queue ON queue_events(queue_id, id)')
+
+            # Histogramas compactos de filas por guild/hora (buckets log2, ver utils/queue_metrics.py)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS queue_histograms (
+                    guild_id INTEGER NOT NULL,
+                    hour TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (guild_id, hour, metric, bucket)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_queue_histograms_hour ON queue_histograms(hour)')
+
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS season_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -152,6 +223,35 @@ class DatabaseManager:
                 )
             ''')
 
+            # Participações de temporadas encerradas; match_participants guarda só a temporada atual.
+            # A PK começa pela temporada, então cada temporada arquivada fica contígua no arquivo.
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS match_participants_archive (
+                    season_name TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    match_id TEXT NOT NULL,
+                    discord_id INTEGER NOT NULL,
+                    team TEXT NOT NULL,
+                    champion TEXT,
+                    kills INTEGER DEFAULT 0,
+                    deaths INTEGER DEFAULT 0,
+                    assists INTEGER DEFAULT 0,
+                    damage_dealt INTEGER DEFAULT 0,
+                    result TEXT,
+                    pdl_change INTEGER DEFAULT 0,
+                    is_mvp INTEGER DEFAULT 0,
+                    is_bagre INTEGER DEFAULT 0,
+                    created_at TIMESTAMP,
+                    PRIMARY KEY(season_name, id)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_mp_archive_player ON match_participants_archive(discord_id, id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_mp_archive_match ON match_participants_archive(match_id)')
+
+            # Ranking final de cada temporada e comparação de um jogador entre temporadas
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_season_history_ranking ON season_history(season_name, pdl DESC, discord_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_season_history_player ON season_history(discord_id)')
+
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS fairplay_incidents (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -192,6 +292,157 @@ class DatabaseManager:
                 )
             ''')
 
+            # Rollup diário por guild/jogador: janelas de 7/30/90 dias somam no máximo 90 linhas
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS player_daily_stats (
+                    guild_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    discord_id INTEGER NOT NULL,
+                    games INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    mvps INTEGER NOT NULL DEFAULT 0,
+                    bagres INTEGER NOT NULL DEFAULT 0,
+                    pdl_delta INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY(guild_id, day, discord_id)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_player_daily_stats_player ON player_daily_stats(discord_id, day)')
+
+            # Matriz de sinergia: uma linha por (jogador, tipo, outro jogador); 'dupla' = mesmo
+            # time, 'rival' = time adversário. Consultar um jogador é um range scan da PK.
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS player_pair_stats (
+                    discord_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    other_id INTEGER NOT NULL,
+                    games INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY(discord_id, kind, other_id)
+                ) WITHOUT ROWID
+            ''')
+
+            # Série temporal de PDL (um ponto por jogador por partida registrada)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS player_pdl_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    discord_id INTEGER NOT NULL,
+                    pdl INTEGER NOT NULL,
+                    match_id TEXT,
+                    season_name TEXT,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_player_pdl_history ON player_pdl_history(discord_id, recorded_at)')
+
+            # Partição do ranking por guild; pdl é copiado de players pelo trigger abaixo
+            # para que o ranking de cada guild seja um range scan no próprio índice
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS guild_players (
+                    guild_id INTEGER NOT NULL,
+                    discord_id INTEGER NOT NULL,
+                    pdl INTEGER NOT NULL,
+                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY(guild_id, discord_id)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_guild_players_ranking ON guild_players(guild_id, pdl DESC, discord_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_guild_players_player ON guild_players(discord_id)')
+            await db.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_guild_players_pdl AFTER UPDATE OF pdl ON players
+                BEGIN
+                    UPDATE guild_players SET pdl = NEW.pdl WHERE discord_id = NEW.discord_id;
+                END
+            ''')
+            await db.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_guild_players_delete AFTER DELETE ON players
+                BEGIN
+                    DELETE FROM guild_players WHERE discord_id = OLD.discord_id;
+                END
+            ''')
+
+            # Leaderboards: índices de expressão para estatísticas que já vivem em players
+            # e tabela de streaks mantida a cada partida registrada
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_players_mvp ON players(mvp_count DESC, discord_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_players_bagre ON players(bagre_count DESC, discord_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_players_games ON players((wins + losses) DESC, discord_id)')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_players_winrate
+                ON players((CAST(wins AS REAL) / (wins + losses)) DESC, (wins + losses) DESC, discord_id)
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS player_rolling_stats (
+                    discord_id INTEGER PRIMARY KEY,
+                    current_streak INTEGER NOT NULL DEFAULT 0,
+                    best_win_streak INTEGER NOT NULL DEFAULT 0,
+                    mvp_streak INTEGER NOT NULL DEFAULT 0,
+                    best_mvp_streak INTEGER NOT NULL DEFAULT 0,
+                    recent_results INTEGER NOT NULL DEFAULT 0,
+                    recent_mvps INTEGER NOT NULL DEFAULT 0,
+                    recent_count INTEGER NOT NULL DEFAULT 0,
+                    recent_pdl TEXT NOT NULL DEFAULT '',
+                    recent_pdl_sum INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_rolling_current_streak ON player_rolling_stats(current_streak DESC, discord_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_rolling_best_streak ON player_rolling_stats(best_win_streak DESC, discord_id)')
+            # Reset de W/L (temporada nova, /resetar) zera também os streaks
+            await db.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_rolling_stats_reset AFTER UPDATE OF wins, losses ON players
+                WHEN NEW.wins = 0 AND NEW.losses = 0
+                BEGIN
+                    DELETE FROM player_rolling_stats WHERE discord_id = NEW.discord_id;
+                END
+            ''')
+            await db.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_rolling_stats_delete AFTER DELETE ON players
+                BEGIN
+                    DELETE FROM player_rolling_stats WHERE discord_id = OLD.discord_id;
+                END
+            ''')
+
+            # Snapshots do ranking publicado (base para os deltas de PDL do embed)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS ranking_snapshot_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_ranking_snapshot_runs_guild ON ranking_snapshot_runs(guild_id, id)')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS ranking_snapshots (
+                    snapshot_id INTEGER NOT NULL,
+                    discord_id INTEGER NOT NULL,
+                    pdl INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY(snapshot_id, discord_id)
+                ) WITHOUT ROWID
+            ''')
+
+            # Paginação do ranking por keyset (pdl DESC, discord_id): cada página é um
+            # range scan no índice, sem OFFSET e sem carregar a tabela inteira
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_players_ranking ON players(pdl DESC, discord_id)')
+
+            # Versão dos dados do ranking: qualquer mudança em players (inclusive via SQL
+            # direto em scripts/admin) incrementa metadata.ranking_version, assim como
+            # entradas e saídas em guild_players, que mudam a partição vista pela guild
+            for trigger_name, trigger_event in (
+                ('trg_ranking_version_insert', 'AFTER INSERT ON players'),
+                ('trg_ranking_version_delete', 'AFTER DELETE ON players'),
+                ('trg_ranking_version_update', 'AFTER UPDATE OF pdl, wins, losses, mvp_count, bagre_count, riot_id, username, lol_rank ON players'),
+                ('trg_ranking_version_guild_insert', 'AFTER INSERT ON guild_players'),
+                ('trg_ranking_version_guild_delete', 'AFTER DELETE ON guild_players'),
+            ):
+                await db.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_event}
+                    BEGIN
+                        INSERT INTO metadata(key, value) VALUES('ranking_version', '1')
+                        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+                    END
+                ''')
+
             # Garantir colunas extras após upgrades
             async with db.execute("PRAGMA table_info(matches)") as cursor:
                 columns = await cursor.fetchall()
@@ -213,6 +464,63 @@ class DatabaseManager:
                 if 'is_bagre' not in column_names:
                     await db.execute("ALTER TABLE match_participants ADD COLUMN is_bagre INTEGER DEFAULT 0")
 
+            # Histórico paginado por jogador (keyset em match_participants.id)
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_match_participants_player ON match_participants(discord_id, id)')
+
+            # Agregações por guild/período partem de matches e chegam aos participantes por
+            # match_id (criados depois das migrações, pois matches.guild_id pode ser recente)
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_matches_guild_created ON matches(guild_id, created_at)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_match_participants_match ON match_participants(match_id)')
+            # Bancos antigos criaram matches.match_id sem UNIQUE (e portanto sem índice)
+            async with db.execute('''
+                SELECT 1 FROM pragma_index_list('matches') il, pragma_index_info(il.name) ii
+                WHERE ii.seqno = 0 AND ii.name = 'match_id'
+            ''') as cursor:
+                if not await cursor.fetchone():
+                    await db.execute('CREATE INDEX IF NOT EXISTS idx_matches_match_id ON matches(match_id)')
+
+            async with db.execute("PRAGMA table_info(queues)") as cursor:
+                columns = await cursor.fetchall()
+                column_names = [column[1] for column in columns]
+                if 'last_activity_at' not in column_names:
+                    await db.execute("ALTER TABLE queues ADD COLUMN last_activity_at TIMESTAMP")
+                    await db.execute("UPDATE queues SET last_activity_at = created_at")
+                if 'base_name' not in column_names:
+                    await db.execute("ALTER TABLE queues ADD COLUMN base_name TEXT")
+                    await db.execute("UPDATE queues SET base_name = name")
+                if 'instance' not in column_names:
+                    await db.execute("ALTER TABLE queues ADD COLUMN instance INTEGER DEFAULT 1")
+
+            async with db.execute("PRAGMA table_info(player_rolling_stats)") as cursor:
+                columns = await cursor.fetchall()
+                column_names = [column[1] for column in columns]
+                for column, definition in (
+                    ('mvp_streak', 'INTEGER NOT NULL DEFAULT 0'),
+                    ('best_mvp_streak', 'INTEGER NOT NULL DEFAULT 0'),
+                    ('recent_results', 'INTEGER NOT NULL DEFAULT 0'),
+                    ('recent_mvps', 'INTEGER NOT NULL DEFAULT 0'),
+                    ('recent_count', 'INTEGER NOT NULL DEFAULT 0'),
+                    ('recent_pdl', "TEXT NOT NULL DEFAULT ''"),
+                    ('recent_pdl_sum', 'INTEGER NOT NULL DEFAULT 0'),
+                ):
+                    if column not in column_names:
+                        await db.execute(f"ALTER TABLE player_rolling_stats ADD COLUMN {column} {definition}")
+
+            await self._migrate_metadata_ranking_snapshots(db)
+            await self._backfill_guild_players(db)
+            async with db.execute("SELECT 1 FROM metadata WHERE key = 'pair_stats_backfilled'") as cursor:
+                if not await cursor.fetchone():
+                    await self._backfill_pair_stats(db)
+                    await db.execute("INSERT INTO metadata(key, value) VALUES('pair_stats_backfilled', '1')")
+            async with db.execute("SELECT 1 FROM metadata WHERE key = 'rolling_stats_backfilled'") as cursor:
+                if not await cursor.fetchone():
+                    await self._backfill_rolling_stats(db)
+                    await db.execute("INSERT INTO metadata(key, value) VALUES('rolling_stats_backfilled', '1')")
+            async with db.execute("SELECT 1 FROM metadata WHERE key = 'daily_stats_backfilled'") as cursor:
+                if not await cursor.fetchone():
+                    await self._rebuild_daily_stats(db, None)
+                    await db.execute("INSERT INTO metadata(key, value) VALUES('daily_stats_backfilled', '1')")
+
             await db.commit()
             print("Banco de dados inicializado com sucesso!")
 
@@ -258,24 +566,267 @@ class DatabaseManager:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
-                async with db.execute('SELECT * FROM players ORDER BY pdl DESC') as cursor:
+                async with db.execute('SELECT * FROM players ORDER BY pdl DESC, discord_id') as cursor:
                     rows = await cursor.fetchall()
                     return [dict(row) for row in rows]
         except Exception as e:
             print(f"Erro ao buscar todos os jogadores: {e}")
             return []
 
-    async def get_ranking_snapshot(self, limit: int = 20) -> List[Dict[str, Any]]:
+    async def _ranking_source(self, db: aiosqlite.Connection, guild_id: Optional[int]) -> tuple:
+        """FROM/WHERE do ranking: partição da guild (idx_guild_players_ranking) ou tabela global.
+
+        Guilds sem nenhum membro em guild_players continuam vendo o ranking global.
+        Retorna (sql, params, alias) onde `alias` é a tabela cujas colunas pdl/discord_id
+        seguem a ordem do índice.
+        """
+        if await self._has_guild_partition(db, guild_id):
+            return (
+                'FROM guild_players g JOIN players p ON p.discord_id = g.discord_id WHERE g.guild_id = ?',
+                (guild_id,),
+                'g'
+            )
+        return 'FROM players p WHERE 1 = 1', (), 'p'
+
+    async def _has_guild_partition(self, db: aiosqlite.Connection, guild_id: Optional[int]) -> bool:
+        if not guild_id:
+            return False
+        async with db.execute('SELECT 1 FROM guild_players WHERE guild_id = ? LIMIT 1', (guild_id,)) as cursor:
+            return await cursor.fetchone() is not None
+
+    async def get_ranking_snapshot(self, limit: int = 20, guild_id: Optional[int] = None) -> List[Dict[str, Any]]:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
-                async with db.execute('SELECT * FROM players ORDER BY pdl DESC LIMIT ?', (limit,)) as cursor:
+                source, params, alias = await self._ranking_source(db, guild_id)
+                async with db.execute(
+                    f'SELECT p.* {source} ORDER BY {alias}.pdl DESC, {alias}.discord_id LIMIT ?',
+                    (*params, limit)
+                ) as cursor:
                     rows = await cursor.fetchall()
                     return [dict(row) for row in rows]
         except Exception as e:
             print(f"Erro ao obter snapshot do ranking: {e}")
             return []
 
+    async def count_ranking_players(self, guild_id: Optional[int] = None) -> int:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                source, params, _ = await self._ranking_source(db, guild_id)
+                async with db.execute(f'SELECT COUNT(*) {source}', params) as cursor:
+                    row = await cursor.fetchone()
+                    return row[0] if row else 0
+        except Exception as e:
+            print(f"Erro ao contar jogadores do ranking: {e}")
+            return 0
+
+    async def get_ranking_page(
+        self,
+        limit: int = 10,
+        after: Optional[tuple] = None,
+        before: Optional[tuple] = None,
+        guild_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Página do ranking por keyset em (pdl DESC, discord_id).
+
+        `after`/`before` são a chave (pdl, discord_id) da última/primeira linha da
+        página atual; o custo é o mesmo para qualquer página.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                source, params, a = await self._ranking_source(db, guild_id)
+                if after is not None:
+                    query = f'''
+                        SELECT p.* {source}
+                          AND {a}.pdl <= ? AND ({a}.pdl < ? OR {a}.discord_id > ?)
+                        ORDER BY {a}.pdl DESC, {a}.discord_id LIMIT ?
+                    '''
+                    params = (*params, after[0], after[0], after[1], limit)
+                elif before is not None:
+                    query = f'''
+                        SELECT p.* {source}
+                          AND {a}.pdl >= ? AND ({a}.pdl > ? OR {a}.discord_id < ?)
+                        ORDER BY {a}.pdl ASC, {a}.discord_id DESC LIMIT ?
+                    '''
+                    params = (*params, before[0], before[0], before[1], limit)
+                else:
+                    query = f'SELECT p.* {source} ORDER BY {a}.pdl DESC, {a}.discord_id LIMIT ?'
+                    params = (*params, limit)
+                async with db.execute(query, params) as cursor:
+                    rows = [dict(row) for row in await cursor.fetchall()]
+            if before is not None:
+                rows.reverse()
+            return rows
+        except Exception as e:
+            print(f"Erro ao obter página do ranking: {e}")
+            return []
+
+    async def get_leaderboard(
+        self,
+        stat: str,
+        limit: int = 10,
+        guild_id: Optional[int] = None,
+        min_games: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Top `limit` de uma estatística; cada consulta percorre o índice correspondente.
+
+        Com guild, o filtro de membros é um lookup na PK de guild_players por linha
+        lida, mantendo a ordem do índice global.
+        """
+        games = '(p.wins + p.losses)'
+        queries = {
+            'winrate': (
+                'players p', f'(CAST(p.wins AS REAL) / {games})',
+                f'{games} >= ?', f'(CAST(p.wins AS REAL) / {games}) DESC, {games} DESC, p.discord_id'
+            ),
+            'mvp': ('players p', 'p.mvp_count', 'p.mvp_count > 0', 'p.mvp_count DESC, p.discord_id'),
+            'bagre': ('players p', 'p.bagre_count', 'p.bagre_count > 0', 'p.bagre_count DESC, p.discord_id'),
+            'partidas': ('players p', games, f'{games} > 0', f'{games} DESC, p.discord_id'),
+            'streak': (
+                'player_rolling_stats r JOIN players p ON p.discord_id = r.discord_id', 'r.current_streak',
+                'r.current_streak > 0', 'r.current_streak DESC, r.discord_id'
+            ),
+            'melhor_streak': (
+                'player_rolling_stats r JOIN players p ON p.discord_id = r.discord_id', 'r.best_win_streak',
+                'r.best_win_streak > 0', 'r.best_win_streak DESC, r.discord_id'
+            ),
+        }
+        if stat not in queries:
+            raise ValueError(f"Estatística desconhecida: {stat}")
+        source, value, condition, order = queries[stat]
+        params: List[Any] = [min_games] if stat == 'winrate' else []
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                if await self._has_guild_partition(db, guild_id):
+                    condition += ' AND EXISTS (SELECT 1 FROM guild_players g WHERE g.guild_id = ? AND g.discord_id = p.discord_id)'
+                    params.append(guild_id)
+                async with db.execute(f'''
+                    SELECT p.discord_id, p.riot_id, p.username, p.pdl, p.wins, p.losses, {value} AS value
+                    FROM {source}
+                    WHERE {condition}
+                    ORDER BY {order}
+                    LIMIT ?
+                ''', (*params, limit)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao montar leaderboard {stat}: {e}")
+            return []
+
+    async def add_guild_player(self, guild_id: int, discord_id: int) -> None:
+        """Inclui o jogador na partição de ranking da guild (idempotente)."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('''
+                    INSERT OR IGNORE INTO guild_players (guild_id, discord_id, pdl)
+                    SELECT ?, discord_id, pdl FROM players WHERE discord_id = ?
+                ''', (guild_id, discord_id))
+                await db.commit()
+        except Exception as e:
+            print(f"Erro ao vincular jogador {discord_id} à guild {guild_id}: {e}")
+
+    async def _backfill_guild_players(self, db: aiosqlite.Connection) -> None:
+        """Preenche guild_players uma única vez a partir do histórico de partidas e filas."""
+        async with db.execute("SELECT 1 FROM metadata WHERE key = 'guild_players_backfilled'") as cursor:
+            if await cursor.fetchone():
+                return
+        await db.execute('''
+            INSERT OR IGNORE INTO guild_players (guild_id, discord_id, pdl)
+            SELECT DISTINCT m.guild_id, p.discord_id, p.pdl
+            FROM match_participants mp
+            JOIN matches m ON m.match_id = mp.match_id
+            JOIN players p ON p.discord_id = mp.discord_id
+            WHERE m.guild_id IS NOT NULL AND m.guild_id != 0
+        ''')
+        await db.execute('''
+            INSERT OR IGNORE INTO guild_players (guild_id, discord_id, pdl)
+            SELECT DISTINCT q.guild_id, p.discord_id, p.pdl
+            FROM queue_players qp
+            JOIN queues q ON q.id = qp.queue_id
+            JOIN players p ON p.discord_id = qp.discord_id
+        ''')
+        await db.execute("INSERT INTO metadata(key, value) VALUES('guild_players_backfilled', '1')")
+
+    async def _migrate_metadata_ranking_snapshots(self, db: aiosqlite.Connection) -> None:
+        """Converte os antigos blobs JSON metadata.ranking_snapshot_{guild} em ranking_snapshots."""
+        async with db.execute("SELECT key, value FROM metadata WHERE key LIKE 'ranking_snapshot\\_%' ESCAPE '\\'") as cursor:
+            rows = await cursor.fetchall()
+        for key, value in rows:
+            try:
+                guild_id = int(key.rsplit('_', 1)[1])
+                snapshot = json.loads(value) if value else {}
+            except (ValueError, json.JSONDecodeError):
+                continue
+            ordered = sorted(((pdl, int(discord_id)) for discord_id, pdl in snapshot.items()), key=lambda item: (-item[0], item[1]))
+            cursor = await db.execute('INSERT INTO ranking_snapshot_runs (guild_id) VALUES (?)', (guild_id,))
+            await db.executemany(
+                'INSERT INTO ranking_snapshots (snapshot_id, discord_id, pdl, position) VALUES (?, ?, ?, ?)',
+                [(cursor.lastrowid, discord_id, pdl, position) for position, (pdl, discord_id) in enumerate(ordered, 1)]
+            )
+            await db.execute('DELETE FROM metadata WHERE key = ?', (key,))
+
+    async def create_ranking_snapshot(self, guild_id: int, limit: int = 50, keep: int = 168) -> Optional[int]:
+        """Grava o top `limit` atual como novo snapshot da guild e descarta os mais antigos que `keep`."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute('INSERT INTO ranking_snapshot_runs (guild_id) VALUES (?)', (guild_id,))
+                snapshot_id = cursor.lastrowid
+                source, params, a = await self._ranking_source(db, guild_id)
+                await db.execute(f'''
+                    INSERT INTO ranking_snapshots (snapshot_id, discord_id, pdl, position)
+                    SELECT ?, p.discord_id, p.pdl, ROW_NUMBER() OVER (ORDER BY {a}.pdl DESC, {a}.discord_id)
+                    {source}
+                    ORDER BY {a}.pdl DESC, {a}.discord_id
+                    LIMIT ?
+                ''', (snapshot_id, *params, limit))
+                async with db.execute('''
+                    SELECT id FROM ranking_snapshot_runs
+                    WHERE guild_id = ?
+                    ORDER BY id DESC
+                    LIMIT 1 OFFSET ?
+                ''', (guild_id, max(0, keep - 1))) as cursor:
+                    row = await cursor.fetchone()
+                if row:
+                    await db.execute('''
+                        DELETE FROM ranking_snapshots WHERE snapshot_id IN (
+                            SELECT id FROM ranking_snapshot_runs WHERE guild_id = ? AND id < ?
+                        )
+                    ''', (guild_id, row[0]))
+                    await db.execute('DELETE FROM ranking_snapshot_runs WHERE guild_id = ? AND id < ?', (guild_id, row[0]))
+                await db.commit()
+                return snapshot_id
+        except Exception as e:
+            print(f"Erro ao gravar snapshot do ranking: {e}")
+            return None
+
+    async def get_ranking_with_deltas(self, guild_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top `limit` com pdl_delta e previous_position em relação ao último snapshot da guild."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                source, params, a = await self._ranking_source(db, guild_id)
+                async with db.execute(f'''
+                    WITH last_run AS (
+                        SELECT MAX(id) AS id FROM ranking_snapshot_runs WHERE guild_id = ?
+                    ), top AS (
+                        SELECT p.* {source} ORDER BY {a}.pdl DESC, {a}.discord_id LIMIT ?
+                    )
+                    SELECT top.*,
+                           top.pdl - COALESCE(s.pdl, top.pdl) AS pdl_delta,
+                           s.position AS previous_position
+                    FROM top
+                    LEFT JOIN ranking_snapshots s
+                        ON s.snapshot_id = (SELECT id FROM last_run) AND s.discord_id = top.discord_id
+                    ORDER BY top.pdl DESC, top.discord_id
+                ''', (guild_id, *params, limit)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao calcular deltas do ranking: {e}")
+            return []
+
     async def update_player_stats(self, discord_id: int, won: bool, is_mvp: bool = False, is_bagre: bool = False) -> bool:
         """
         Atualiza as estatísticas de um jogador após uma partida.
@@ -556,6 +1107,38 @@ class DatabaseManager:
             print(f"Erro ao contar jogadores: {e}")
             return 0
 
+    async def get_player_rank_position(self, discord_id: int, guild_id: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """Posição do jogador no ranking da guild (ou no geral) como {'position', 'total'}.
+
+        A posição é um COUNT no range do índice do ranking (idx_guild_players_ranking ou
+        idx_players_ranking) com quem está à frente na ordem (pdl DESC, discord_id), sem
+        tocar na tabela players. Retorna None se o jogador não estiver no ranking pedido.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                if await self._has_guild_partition(db, guild_id):
+                    table, scope, params = 'guild_players', 'guild_id = ? AND', (guild_id,)
+                else:
+                    table, scope, params = 'players', '', ()
+                async with db.execute(
+                    f'SELECT pdl FROM {table} WHERE {scope} discord_id = ?', (*params, discord_id)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                if not row:
+                    return None
+                pdl = row[0]
+                async with db.execute(f'''
+                    SELECT COUNT(*) FROM {table}
+                    WHERE {scope} pdl >= ? AND (pdl > ? OR discord_id < ?)
+                ''', (*params, pdl, pdl, discord_id)) as cursor:
+                    ahead = (await cursor.fetchone())[0]
+                async with db.execute(f'SELECT COUNT(*) FROM {table} WHERE {scope} 1 = 1', params) as cursor:
+                    total = (await cursor.fetchone())[0]
+            return {'position': ahead + 1, 'total': total}
+        except Exception as e:
+            print(f"Erro ao calcular posição no ranking: {e}")
+            return None
+
     async def add_fairplay_incident(self, guild_id: int, discord_id: int, reason: str, description: str, created_by: int, penalty_until: Optional[str] = None) -> int:
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute('''
@@ -683,6 +1266,33 @@ class DatabaseManager:
             ''', (guild_id, role_id, discord_id))
             await db.commit()
 
+    async def apply_badge_changes(self, guild_id: int, role_id: int, added: List[int], removed: List[int]) -> None:
+        """Registra atribuições/remoções de badge e os contadores numa única transação."""
+        if not added and not removed:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            if added:
+                await db.executemany('''
+                    INSERT INTO badge_assignments (guild_id, role_id, discord_id)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(guild_id, role_id, discord_id) DO NOTHING
+                ''', [(guild_id, role_id, discord_id) for discord_id in added])
+            if removed:
+                await db.executemany('''
+                    DELETE FROM badge_assignments
+                    WHERE guild_id = ? AND role_id = ? AND discord_id = ?
+                ''', [(guild_id, role_id, discord_id) for discord_id in removed])
+            await db.executemany('''
+                INSERT INTO metadata(key, value)
+                VALUES(?, CAST(? AS TEXT))
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + CAST(excluded.value AS INTEGER)
+            ''', [
+                (key, amount)
+                for key, amount in (('badge_roles_assigned', len(added)), ('badge_roles_removed', len(removed)))
+                if amount
+            ])
+            await db.commit()
+
     async def list_badge_holders(self, guild_id: int, role_id: int) -> List[int]:
         async with aiosqlite.connect(self.db_path) as db:
             async with db.execute('''
@@ -692,34 +1302,155 @@ class DatabaseManager:
                 rows = await cursor.fetchall()
                 return [row[0] for row in rows]
 
-    async def bulk_reset_player_stats(self) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                UPDATE players
-                SET pdl = ?, wins = 0, losses = 0, mvp_count = 0, bagre_count = 0,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (config.DEFAULT_PDL,))
-            await db.commit()
+    async def _bump_season_history_version(self, db: aiosqlite.Connection) -> None:
+        """Invalida os caches de temporadas; só muda quando season_history é gravada."""
+        await db.execute('''
+            INSERT INTO metadata(key, value) VALUES('season_history_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        ''')
 
-    async def save_season_history(self, season_name: str, players: List[Dict[str, Any]]) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.executemany('''
-                INSERT INTO season_history (season_name, discord_id, riot_id, pdl, wins, losses, mvp_count, bagre_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                (
-                    season_name,
-                    player['discord_id'],
-                    player.get('riot_id'),
-                    player['pdl'],
-                    player['wins'],
-                    player['losses'],
-                    player.get('mvp_count', 0),
-                    player.get('bagre_count', 0)
-                )
-                for player in players
-            ])
-            await db.commit()
+    async def get_season_history_version(self) -> int:
+        value = await self.get_metadata('season_history_version')
+        try:
+            return int(value) if value else 0
+        except ValueError:
+            return 0
+
+    async def list_seasons(self) -> List[Dict[str, Any]]:
+        """Temporadas com snapshot salvo, da mais recente para a mais antiga."""
+        query = '''
+            SELECT season_name, COUNT(*) AS players, MAX(snapshot_at) AS snapshot_at
+            FROM season_history
+            GROUP BY season_name
+            ORDER BY snapshot_at DESC
+        '''
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query) as cursor:
+                    return [dict(row) for row in await cursor.fetchall()]
+        except Exception as e:
+            print(f"Erro ao listar temporadas: {e}")
+            return []
+
+    async def get_season_ranking(self, season_name: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Topo do ranking salvo da temporada, lido em ordem do índice (season_name, pdl DESC)."""
+        query = '''
+            SELECT discord_id, riot_id, pdl, wins, losses, mvp_count, bagre_count, snapshot_at
+            FROM season_history
+            WHERE season_name = ?
+            ORDER BY pdl DESC, discord_id
+            LIMIT ?
+        '''
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, (season_name, limit)) as cursor:
+                    rows = await cursor.fetchall()
+            return [dict(row, position=position) for position, row in enumerate(rows, 1)]
+        except Exception as e:
+            print(f"Erro ao buscar ranking da temporada {season_name}: {e}")
+            return []
+
+    async def get_player_seasons(self, discord_id: int) -> List[Dict[str, Any]]:
+        """Resultado do jogador em cada temporada salva, com posição e total de participantes.
+
+        A posição é uma contagem no prefixo (season_name, pdl DESC) do índice, sem
+        ordenar a temporada inteira.
+        """
+        query = '''
+            SELECT s.season_name, s.pdl, s.wins, s.losses, s.mvp_count, s.bagre_count, s.snapshot_at,
+                   (
+                       SELECT COUNT(*) FROM season_history r
+                       WHERE r.season_name = s.season_name
+                         AND (r.pdl > s.pdl OR (r.pdl = s.pdl AND r.discord_id < s.discord_id))
+                   ) + 1 AS position,
+                   (SELECT COUNT(*) FROM season_history r WHERE r.season_name = s.season_name) AS players
+            FROM season_history s
+            WHERE s.discord_id = ?
+            ORDER BY s.snapshot_at, s.id
+        '''
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, (discord_id,)) as cursor:
+                    return [dict(row) for row in await cursor.fetchall()]
+        except Exception as e:
+            print(f"Erro ao buscar temporadas do jogador {discord_id}: {e}")
+            return []
+
+    async def _archive_match_history(self, db: aiosqlite.Connection, season_name: str, before: str) -> int:
+        """Move para match_participants_archive as participações anteriores a `before`, na transação do chamador."""
+        await db.execute(f'''
+            INSERT OR IGNORE INTO match_participants_archive (season_name, {_ARCHIVE_COLUMNS})
+            SELECT ?, {_ARCHIVE_COLUMNS}
+            FROM match_participants
+            WHERE created_at < datetime(?)
+        ''', (season_name, before))
+        cursor = await db.execute('DELETE FROM match_participants WHERE created_at < datetime(?)', (before,))
+        await db.execute('''
+            INSERT INTO metadata(key, value) VALUES('match_history_archived_before', datetime(?))
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (before,))
+        return cursor.rowcount
+
+    async def rollover_season(self, season_name: str, started_at: str, started_by: int) -> Optional[Dict[str, Any]]:
+        """Inicia a temporada `season_name` em uma única transação, sem carregar jogadores no Python.
+
+        Grava o snapshot da temporada que terminou em season_history com INSERT ... SELECT
+        (sob o mesmo nome usado no arquivo de participações), reseta players com um UPDATE,
+        arquiva as participações dessa temporada e atualiza os metadados.
+        Retorna {'players', 'archived', 'previous_season'} ou None se já houver temporada
+        ativa (verificado dentro da transação) ou em caso de erro, quando nada é aplicado.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('BEGIN IMMEDIATE')
+                try:
+                    async with db.execute(
+                        "SELECT key, value FROM metadata WHERE key IN ('season_active', 'season_name')"
+                    ) as cursor:
+                        current = {row[0]: row[1] for row in await cursor.fetchall()}
+                    if current.get('season_active') == '1':
+                        await db.rollback()
+                        return None
+                    # O snapshot e o arquivo descrevem a temporada que está terminando, não a nova
+                    previous_season = current.get('season_name') or 'pre_temporada'
+                    cursor = await db.execute('''
+                        INSERT INTO season_history (season_name, discord_id, riot_id, pdl, wins, losses, mvp_count, bagre_count)
+                        SELECT ?, discord_id, riot_id, pdl, wins, losses, mvp_count, bagre_count
+                        FROM players
+                    ''', (previous_season,))
+                    players = cursor.rowcount
+                    await db.execute('''
+                        UPDATE players
+                        SET pdl = ?, wins = 0, losses = 0, mvp_count = 0, bagre_count = 0,
+                            updated_at = CURRENT_TIMESTAMP
+                    ''', (config.DEFAULT_PDL,))
+                    archived = await self._archive_match_history(db, previous_season, started_at)
+                    await db.executemany('''
+                        INSERT INTO metadata(key, value) VALUES(?, ?)
+                        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    ''', [
+                        ('season_active', '1'),
+                        ('season_name', season_name),
+                        ('season_started_at', started_at),
+                        ('season_started_by', str(started_by)),
+                        ('season_locked', '0'),
+                    ])
+                    await db.execute('''
+                        INSERT INTO metadata(key, value) VALUES('seasons_started', '1')
+                        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+                    ''')
+                    await self._bump_season_history_version(db)
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            return {'players': players, 'archived': archived, 'previous_season': previous_season}
+        except Exception as e:
+            print(f"Erro ao iniciar temporada {season_name}: {e}")
+            return None
 
     async def get_full_ranking(self) -> List[Dict[str, Any]]:
         return await self.get_all_players()
@@ -772,54 +1503,504 @@ class DatabaseManager:
                 )
                 for entry in participants
             ])
+            await self._update_rolling_stats(db, participants)
+            participant_ids = [entry['discord_id'] for entry in participants]
+            placeholders = ','.join('?' for _ in participant_ids)
+            await db.execute(f'''
+                INSERT OR IGNORE INTO guild_players (guild_id, discord_id, pdl)
+                SELECT m.guild_id, p.discord_id, p.pdl
+                FROM matches m JOIN players p ON p.discord_id IN ({placeholders})
+                WHERE m.match_id = ? AND m.guild_id != 0
+            ''', (*participant_ids, match_id))
+            await db.executemany('''
+                INSERT INTO player_daily_stats (guild_id, day, discord_id, games, wins, losses, mvps, bagres, pdl_delta)
+                SELECT COALESCE(guild_id, 0), date(created_at), ?, 1, ?, ?, ?, ?, ?
+                FROM matches WHERE match_id = ?
+                ON CONFLICT(guild_id, day, discord_id) DO UPDATE SET
+                    games = games + 1,
+                    wins = wins + excluded.wins,
+                    losses = losses + excluded.losses,
+                    mvps = mvps + excluded.mvps,
+                    bagres = bagres + excluded.bagres,
+                    pdl_delta = pdl_delta + excluded.pdl_delta
+            ''', [
+                (
+                    entry['discord_id'],
+                    1 if entry['result'] == 'win' else 0,
+                    1 if entry['result'] == 'loss' else 0,
+                    1 if entry.get('is_mvp') else 0,
+                    1 if entry.get('is_bagre') else 0,
+                    entry.get('pdl_change', 0),
+                    match_id
+                )
+                for entry in participants
+            ])
+            await self._update_pair_stats(db, participants)
+            # PDL já atualizado pelo update_player_stats: grava o ponto da série de cada participante
+            await db.execute(f'''
+                INSERT INTO player_pdl_history (discord_id, pdl, match_id, season_name)
+                SELECT discord_id, pdl, ?, (SELECT value FROM metadata WHERE key = 'season_name')
+                FROM players
+                WHERE discord_id IN ({placeholders})
+            ''', (match_id, *participant_ids))
             await db.commit()
 
-    async def get_recent_matches_for_player(self, discord_id: int, days: int = 30, limit: int = 20) -> List[Dict[str, Any]]:
-        query = '''
-            SELECT mp.match_id, mp.team, mp.result, mp.pdl_change, mp.is_mvp, mp.is_bagre,
-                   mp.created_at, m.winner, m.mvp_id, m.bagre_id
-            FROM match_participants mp
-            JOIN matches m ON mp.match_id = m.match_id
-            WHERE mp.discord_id = ?
-              AND mp.created_at >= datetime('now', ?)
-            ORDER BY mp.created_at DESC
+    async def _update_rolling_stats(self, db: aiosqlite.Connection, participants: List[Dict[str, Any]]) -> None:
+        """Avança streaks, forma recente e soma móvel de PDL dos participantes (ver utils/rolling_stats.py)."""
+        entries = [entry for entry in participants if entry.get('result') in ('win', 'loss')]
+        if not entries:
+            return
+        columns = ', '.join(rolling_stats.ROLLING_COLUMNS)
+        placeholders = ','.join('?' for _ in entries)
+        # A conexão é do chamador: lê tuplas e nomeia as colunas aqui, sem mexer no row_factory
+        async with db.execute(
+            f'SELECT {columns}, discord_id FROM player_rolling_stats WHERE discord_id IN ({placeholders})',
+            [entry['discord_id'] for entry in entries]
+        ) as cursor:
+            current = {
+                row[-1]: dict(zip(rolling_stats.ROLLING_COLUMNS, row))
+                for row in await cursor.fetchall()
+            }
+        rows = []
+        for entry in entries:
+            state = rolling_stats.apply_match(
+                current.get(entry['discord_id']),
+                entry['result'] == 'win',
+                bool(entry.get('is_mvp')),
+                entry.get('pdl_change', 0)
+            )
+            rows.append((entry['discord_id'], *[state[column] for column in rolling_stats.ROLLING_COLUMNS]))
+        await db.executemany(f'''
+            INSERT OR REPLACE INTO player_rolling_stats (discord_id, {columns}, updated_at)
+            VALUES (?, {','.join('?' for _ in rolling_stats.ROLLING_COLUMNS)}, CURRENT_TIMESTAMP)
+        ''', rows)
+
+    async def _backfill_rolling_stats(self, db: aiosqlite.Connection) -> None:
+        """Reconstrói player_rolling_stats reaplicando as partidas da temporada atual em ordem de id."""
+        async with db.execute("SELECT value FROM metadata WHERE key = 'season_started_at'") as cursor:
+            row = await cursor.fetchone()
+        season_started_at = row[0] if row else None
+        states: Dict[int, Dict[str, Any]] = {}
+        async with db.execute('''
+            SELECT discord_id, result, is_mvp, pdl_change
+            FROM match_participants
+            WHERE result IN ('win', 'loss') AND (? IS NULL OR created_at >= datetime(?))
+            ORDER BY id
+        ''', (season_started_at, season_started_at)) as cursor:
+            async for discord_id, result, is_mvp, pdl_change in cursor:
+                states[discord_id] = rolling_stats.apply_match(
+                    states.get(discord_id), result == 'win', bool(is_mvp), pdl_change or 0
+                )
+        columns = ', '.join(rolling_stats.ROLLING_COLUMNS)
+        await db.execute('DELETE FROM player_rolling_stats')
+        await db.executemany(f'''
+            INSERT INTO player_rolling_stats (discord_id, {columns}, updated_at)
+            VALUES (?, {','.join('?' for _ in rolling_stats.ROLLING_COLUMNS)}, CURRENT_TIMESTAMP)
+        ''', [
+            (discord_id, *[state[column] for column in rolling_stats.ROLLING_COLUMNS])
+            for discord_id, state in states.items()
+        ])
+
+    async def _update_pair_stats(self, db: aiosqlite.Connection, participants: List[Dict[str, Any]]) -> None:
+        """Acumula todos os pares (dupla/rival) da partida num único executemany."""
+        entries = [entry for entry in participants if entry.get('result') in ('win', 'loss')]
+        rows = []
+        for entry in entries:
+            won = 1 if entry['result'] == 'win' else 0
+            for other in entries:
+                if other['discord_id'] == entry['discord_id']:
+                    continue
+                kind = 'dupla' if other['team'] == entry['team'] else 'rival'
+                rows.append((entry['discord_id'], kind, other['discord_id'], won))
+        if not rows:
+            return
+        await db.executemany('''
+            INSERT INTO player_pair_stats (discord_id, kind, other_id, games, wins)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(discord_id, kind, other_id) DO UPDATE SET
+                games = games + 1,
+                wins = wins + excluded.wins
+        ''', rows)
+
+    async def _backfill_pair_stats(self, db: aiosqlite.Connection) -> None:
+        """Monta a matriz inteira a partir do histórico com um self-join agregado."""
+        await db.execute('DELETE FROM player_pair_stats')
+        await db.execute('''
+            INSERT INTO player_pair_stats (discord_id, kind, other_id, games, wins)
+            SELECT a.discord_id,
+                   CASE WHEN a.team = b.team THEN 'dupla' ELSE 'rival' END,
+                   b.discord_id,
+                   COUNT(*),
+                   SUM(a.result = 'win')
+            FROM match_participants a
+            JOIN match_participants b ON b.match_id = a.match_id AND b.discord_id != a.discord_id
+            WHERE a.result IN ('win', 'loss') AND b.result IN ('win', 'loss')
+            GROUP BY a.discord_id, CASE WHEN a.team = b.team THEN 'dupla' ELSE 'rival' END, b.discord_id
+        ''')
+
+    async def get_pair_stats(self, discord_id: int, kind: str, min_games: int = 3, best: bool = True, limit: int = 3) -> List[Dict[str, Any]]:
+        """Melhores (ou piores) parceiros/adversários do jogador pela taxa de vitória.
+
+        Lê só a linha do jogador na matriz (prefixo da PK), ordenando no máximo
+        um registro por jogador com quem já dividiu partida.
+        """
+        direction = 'DESC' if best else 'ASC'
+        query = f'''
+            SELECT other_id, games, wins, CAST(wins AS REAL) / games AS win_rate
+            FROM player_pair_stats
+            WHERE discord_id = ? AND kind = ? AND games >= ?
+            ORDER BY win_rate {direction}, games DESC, other_id
             LIMIT ?
         '''
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
-                async with db.execute(query, (discord_id, f'-{int(days)} days', limit)) as cursor:
+                async with db.execute(query, (discord_id, kind, min_games, limit)) as cursor:
                     rows = await cursor.fetchall()
                     return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Erro ao buscar histórico do jogador {discord_id}: {e}")
+            print(f"Erro ao buscar sinergia do jogador {discord_id}: {e}")
             return []
 
-    async def get_guild_recent_participation(self, guild_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    async def get_player_rolling_stats(self, discord_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute('SELECT * FROM player_rolling_stats WHERE discord_id = ?', (discord_id,)) as cursor:
+                    row = await cursor.fetchone()
+                    return dict(row) if row else None
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas acumuladas do jogador {discord_id}: {e}")
+            return None
+
+    async def get_pdl_series(self, discord_id: int, days: int = 30, max_points: int = 60) -> List[Dict[str, Any]]:
+        """Série de PDL do período reduzida a no máximo `max_points` pontos.
+
+        O intervalo é dividido em `max_points` faixas de tempo e cada faixa devolve o
+        último valor registrado nela (MAX(id) + coluna solta do SQLite).
+        """
         query = '''
-            SELECT mp.discord_id, mp.result, mp.is_mvp, mp.pdl_change
-            FROM match_participants mp
+            SELECT MAX(id) AS id, recorded_at, pdl
+            FROM player_pdl_history
+            WHERE discord_id = ? AND recorded_at >= datetime('now', ?)
+            GROUP BY CAST((julianday(recorded_at) - julianday('now', ?)) * ? / ? AS INTEGER)
+            ORDER BY id
+        '''
+        window = f'-{int(days)} days'
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, (discord_id, window, window, max_points, days)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [{'recorded_at': row['recorded_at'], 'pdl': row['pdl']} for row in rows]
+        except Exception as e:
+            print(f"Erro ao buscar série de PDL do jogador {discord_id}: {e}")
+            return []
+
+    async def _rebuild_daily_stats(self, db: aiosqlite.Connection, days: Optional[int]) -> None:
+        """Recalcula player_daily_stats a partir das partidas (todas ou só os últimos `days` dias)."""
+        participants = 'match_participants'
+        if days is None:
+            await db.execute('DELETE FROM player_daily_stats')
+            match_filter, params = '', ()
+        else:
+            since = f'-{int(days)} days'
+            await db.execute("DELETE FROM player_daily_stats WHERE day >= date('now', ?)", (since,))
+            match_filter, params = "WHERE m.created_at >= date('now', ?)", (since,)
+        async with db.execute('''
+            SELECT 1 FROM metadata
+            WHERE key = 'match_history_archived_before' AND (? IS NULL OR value >= date('now', ?))
+        ''', (days, f'-{int(days or 0)} days')) as cursor:
+            if await cursor.fetchone():
+                # A janela alcança temporadas arquivadas: soma também o arquivo
+                participants = f'''(
+                    SELECT match_id, discord_id, result, is_mvp, is_bagre, pdl_change FROM match_participants
+                    UNION ALL
+                    SELECT match_id, discord_id, result, is_mvp, is_bagre, pdl_change FROM match_participants_archive
+                )'''
+        await db.execute(f'''
+            INSERT INTO player_daily_stats (guild_id, day, discord_id, games, wins, losses, mvps, bagres, pdl_delta)
+            SELECT COALESCE(m.guild_id, 0), date(m.created_at), mp.discord_id,
+                   COUNT(*),
+                   SUM(mp.result = 'win'),
+                   SUM(mp.result = 'loss'),
+                   SUM(mp.is_mvp),
+                   SUM(mp.is_bagre),
+                   SUM(mp.pdl_change)
+            FROM matches m
+            JOIN {participants} mp ON mp.match_id = m.match_id
+            {match_filter}
+            GROUP BY COALESCE(m.guild_id, 0), date(m.created_at), mp.discord_id
+        ''', params)
+
+    async def reconcile_daily_stats(self, days: int = 2) -> bool:
+        """Reconciliação noturna: refaz os últimos dias do rollup a partir dos dados brutos."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await self._rebuild_daily_stats(db, days)
+                await db.commit()
+                return True
+        except Exception as e:
+            print(f"Erro ao reconciliar estatísticas diárias: {e}")
+            return False
+
+    async def get_player_window_stats(self, discord_id: int, days: int = 30, guild_id: Optional[int] = None) -> Dict[str, int]:
+        """Totais do jogador nos últimos `days` dias (hoje incluso), somados do rollup diário."""
+        query = '''
+            SELECT COALESCE(SUM(games), 0), COALESCE(SUM(wins), 0), COALESCE(SUM(losses), 0),
+                   COALESCE(SUM(mvps), 0), COALESCE(SUM(bagres), 0), COALESCE(SUM(pdl_delta), 0)
+            FROM player_daily_stats
+            WHERE discord_id = ? AND day > date('now', ?)
+        '''
+        params: List[Any] = [discord_id, f'-{int(days)} days']
+        if guild_id is not None:
+            query += ' AND guild_id = ?'
+            params.append(guild_id)
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute(query, params) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            print(f"Erro ao somar estatísticas do jogador {discord_id}: {e}")
+            row = None
+        keys = ('games', 'wins', 'losses', 'mvps', 'bagres', 'pdl_delta')
+        return dict(zip(keys, row or (0,) * len(keys)))
+
+    async def get_player_match_page(
+        self,
+        discord_id: int,
+        limit: int = 10,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Página do histórico (mais recentes primeiro) por keyset em match_participants.id.
+
+        `before_id` avança para partidas mais antigas que a última linha da página;
+        `after_id` volta para as mais recentes que a primeira. Busca `limit + 1`
+        linhas para que o chamador saiba se existe outra página na mesma direção.
+        Os ids são preservados no arquivo de temporadas anteriores, então a página
+        só consulta match_participants_archive quando a temporada atual se esgota.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                if after_id is not None:
+                    # Voltando de uma página arquivada: as mais próximas podem estar no arquivo
+                    async with db.execute('SELECT MIN(id) FROM match_participants') as cursor:
+                        hot_start = (await cursor.fetchone())[0]
+                    tables = ['match_participants']
+                    if hot_start is None or after_id < hot_start:
+                        tables.insert(0, 'match_participants_archive')
+                    rows = []
+                    for table in tables:
+                        rows += await self._player_match_rows(
+                            db, table, discord_id, 'AND mp.id > ?', 'ASC', (discord_id, after_id, limit + 1 - len(rows))
+                        )
+                        if len(rows) > limit:
+                            break
+                    rows.reverse()
+                    return rows
+                rows = []
+                for table in ('match_participants', 'match_participants_archive'):
+                    cursor_id = rows[-1]['id'] if rows else before_id
+                    if cursor_id is None:
+                        condition, params = '', (discord_id, limit + 1)
+                    else:
+                        condition, params = 'AND mp.id < ?', (discord_id, cursor_id, limit + 1 - len(rows))
+                    rows += await self._player_match_rows(db, table, discord_id, condition, 'DESC', params)
+                    if len(rows) > limit:
+                        break
+                return rows
+        except Exception as e:
+            print(f"Erro ao paginar histórico do jogador {discord_id}: {e}")
+            return []
+
+    async def _player_match_rows(
+        self,
+        db: aiosqlite.Connection,
+        table: str,
+        discord_id: int,
+        condition: str,
+        order: str,
+        params: tuple
+    ) -> List[Dict[str, Any]]:
+        query = f'''
+            SELECT mp.id, mp.match_id, mp.team, mp.result, mp.pdl_change, mp.is_mvp, mp.is_bagre,
+                   mp.created_at, m.winner
+            FROM {table} mp
             JOIN matches m ON mp.match_id = m.match_id
-            WHERE m.guild_id = ?
-              AND mp.created_at >= datetime('now', ?)
+            WHERE mp.discord_id = ? {condition}
+            ORDER BY mp.id {order}
+            LIMIT ?
         '''
+        async with db.execute(query, params) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    def _group_match_rows(self, rows: List[aiosqlite.Row]) -> List[Dict[str, Any]]:
+        """Agrupa linhas partida × participante (na ordem da consulta) em partidas com `participants`."""
+        matches: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            data = dict(row)
+            match = matches.get(data['match_id'])
+            if match is None:
+                match = {key: data[key] for key in _MATCH_FIELDS if key in data}
+                match['participants'] = []
+                matches[data['match_id']] = match
+            if data.get('discord_id') is not None:
+                match['participants'].append({key: data[key] for key in _PARTICIPANT_FIELDS})
+        return list(matches.values())
+
+    async def get_match_details(self, match_id: str) -> Optional[Dict[str, Any]]:
+        """Partida e participantes em uma única consulta pelo índice de matches.match_id."""
+        query = _MATCHES_WITH_PARTICIPANTS.format(
+            page='''
+                SELECT m.id, m.match_id, m.guild_id, m.winner, m.mvp_id, m.bagre_id, m.duration, m.created_at,
+                       m.blue_team, m.red_team, m.pdl_summary
+                FROM matches m
+                WHERE m.match_id = ?
+            ''',
+            order='team, pdl_change DESC'
+        )
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
-                async with db.execute(query, (guild_id, f'-{int(days)} days')) as cursor:
+                async with db.execute(query, (match_id,)) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Erro ao buscar histórico da guild {guild_id}: {e}")
+            print(f"Erro ao buscar partida {match_id}: {e}")
+            return None
+        if not rows:
+            return None
+        match = self._group_match_rows(rows)[0]
+        if not match['participants']:
+            # Partidas anteriores a match_participants: remonta a partir dos times salvos
+            pdl_summary = json.loads(rows[0]['pdl_summary'] or '{}')
+            for team, raw_ids in (('azul', rows[0]['blue_team']), ('vermelho', rows[0]['red_team'])):
+                for discord_id in json.loads(raw_ids or '[]'):
+                    match['participants'].append({
+                        'discord_id': discord_id,
+                        'team': team,
+                        'result': 'win' if team == match['winner'] else 'loss',
+                        'pdl_change': pdl_summary.get(str(discord_id), 0),
+                        'is_mvp': int(discord_id == match['mvp_id']),
+                        'is_bagre': int(discord_id == match['bagre_id']),
+                        'riot_id': None,
+                    })
+        return match
+
+    async def search_matches(
+        self,
+        guild_id: int,
+        discord_id: Optional[int] = None,
+        winner: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 10,
+        before: Optional[tuple] = None
+    ) -> List[Dict[str, Any]]:
+        """Página de partidas da guild (mais recentes primeiro) já com os participantes.
+
+        Filtra por participante, time vencedor e intervalo de `created_at` e pagina por
+        keyset no par (created_at, id) da última partida entregue, seguindo o índice
+        (guild_id, created_at). Partidas e participantes saem da mesma consulta; retorna
+        até `limit + 1` partidas para que o chamador saiba se existe próxima página.
+        """
+        filters = ['m.guild_id = ?']
+        params: List[Any] = [guild_id]
+        if discord_id is not None:
+            filters.append('''m.match_id IN (
+                SELECT match_id FROM match_participants WHERE discord_id = ?
+                UNION ALL
+                SELECT match_id FROM match_participants_archive WHERE discord_id = ?
+            )''')
+            params.extend((discord_id, discord_id))
+        if winner:
+            filters.append('m.winner = ?')
+            params.append(winner)
+        if since:
+            filters.append('m.created_at >= ?')
+            params.append(since)
+        if until:
+            filters.append('m.created_at < ?')
+            params.append(until)
+        if before:
+            filters.append('(m.created_at, m.id) < (?, ?)')
+            params.extend(before)
+        query = _MATCHES_WITH_PARTICIPANTS.format(
+            page=f'''
+                SELECT m.id, m.match_id, m.guild_id, m.winner, m.mvp_id, m.bagre_id, m.duration, m.created_at
+                FROM matches m
+                WHERE {' AND '.join(filters)}
+                ORDER BY m.created_at DESC, m.id DESC
+                LIMIT ?
+            ''',
+            order='created_at DESC, id DESC, team, pdl_change DESC'
+        )
+        params.append(limit + 1)
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, params) as cursor:
+                    rows = await cursor.fetchall()
+            return self._group_match_rows(rows)
+        except Exception as e:
+            print(f"Erro ao buscar partidas da guild {guild_id}: {e}")
             return []
 
-    async def create_queue(self, guild_id: int, channel_id: int, message_id: int, name: str, mode: str, slots: int, created_by: int) -> int:
+    async def get_guild_weekly_highlights(self, guild_id: int, days: int = 7, top: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """Top `top` por vitórias e por MVPs da guild no período, somado do rollup diário."""
+        query = '''
+            WITH totals AS (
+                SELECT discord_id,
+                       SUM(wins) AS wins,
+                       SUM(losses) AS losses,
+                       SUM(mvps) AS mvps,
+                       SUM(pdl_delta) AS pdl
+                FROM player_daily_stats
+                WHERE guild_id = ?
+                  AND day > date('now', ?)
+                GROUP BY discord_id
+            ), ranked AS (
+                SELECT totals.*,
+                       ROW_NUMBER() OVER (ORDER BY wins DESC, pdl DESC, discord_id) AS wins_rank,
+                       ROW_NUMBER() OVER (ORDER BY mvps DESC, wins DESC, discord_id) AS mvps_rank
+                FROM totals
+            )
+            SELECT * FROM ranked
+            WHERE wins_rank <= ? OR (mvps_rank <= ? AND mvps > 0)
+        '''
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, (guild_id, f'-{int(days)} days', top, top)) as cursor:
+                    rows = [dict(row) for row in await cursor.fetchall()]
+        except Exception as e:
+            print(f"Erro ao agregar destaques da guild {guild_id}: {e}")
+            return {'wins': [], 'mvps': []}
+        return {
+            'wins': sorted((row for row in rows if row['wins_rank'] <= top), key=lambda row: row['wins_rank']),
+            'mvps': sorted((row for row in rows if row['mvps_rank'] <= top and row['mvps'] > 0), key=lambda row: row['mvps_rank']),
+        }
+
+    async def create_queue(
+        self,
+        guild_id: int,
+        channel_id: int,
+        message_id: int,
+        name: str,
+        mode: str,
+        slots: int,
+        created_by: int,
+        base_name: Optional[str] = None,
+        instance: int = 1
+    ) -> int:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 cursor = await db.execute('''
-                    INSERT INTO queues (guild_id, channel_id, message_id, name, mode, slots, created_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (guild_id, channel_id, message_id, name, mode, slots, created_by))
+                    INSERT INTO queues (guild_id, channel_id, message_id, name, mode, slots, created_by, base_name, instance)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (guild_id, channel_id, message_id, name, mode, slots, created_by, base_name or name, instance))
+                await self._log_queue_events(db, [(cursor.lastrowid, queue_events.QUEUE_CREATED, created_by, None)])
                 await db.commit()
                 return cursor.lastrowid
         except Exception as e:
@@ -846,13 +2027,28 @@ class DatabaseManager:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
-                async with db.execute('SELECT * FROM queues WHERE guild_id = ? AND name = ?', (guild_id, name)) as cursor:
+                async with db.execute('''
+                    SELECT * FROM queues
+                    WHERE guild_id = ? AND (name = ? OR base_name = ?)
+                    ORDER BY id DESC
+                    LIMIT 1
+                ''', (guild_id, name, name)) as cursor:
                     row = await cursor.fetchone()
                     return dict(row) if row else None
         except Exception as e:
             print(f"Erro ao buscar fila por nome: {e}")
             return None
 
+    async def get_next_queue_instance(self, guild_id: int, base_name: str) -> int:
+        """Retorna o número da próxima instância de uma fila recorrente."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('''
+                SELECT COALESCE(MAX(instance), 0) + 1 FROM queues
+                WHERE guild_id = ? AND (base_name = ? OR name = ?)
+            ''', (guild_id, base_name, base_name)) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else 1
+
     async def get_active_queues(self, guild_id: Optional[int] = None) -> List[Dict[str, Any]]:
         query = 'SELECT * FROM queues WHERE status = "aberta"'
         params: tuple[Any, ...] = ()
@@ -875,6 +2071,14 @@ class DatabaseManager:
                 await db.execute('''
                     INSERT INTO queue_players (queue_id, discord_id) VALUES (?, ?)
                 ''', (queue_id, discord_id))
+                await db.execute('UPDATE queues SET last_activity_at = CURRENT_TIMESTAMP WHERE id = ?', (queue_id,))
+                await db.execute('''
+                    INSERT OR IGNORE INTO guild_players (guild_id, discord_id, pdl)
+                    SELECT q.guild_id, p.discord_id, p.pdl
+                    FROM queues q JOIN players p ON p.discord_id = ?
+                    WHERE q.id = ?
+                ''', (discord_id, queue_id))
+                await self._log_queue_events(db, [(queue_id, queue_events.PLAYER_JOINED, discord_id, None)])
                 await db.commit()
                 return True
         except aiosqlite.IntegrityError:
@@ -883,10 +2087,13 @@ class DatabaseManager:
             print(f"Erro ao adicionar jogador à fila: {e}")
             return False
 
-    async def remove_player_from_queue(self, queue_id: int, discord_id: int) -> bool:
+    async def remove_player_from_queue(self, queue_id: int, discord_id: int, event_code: int = queue_events.PLAYER_LEFT) -> bool:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 cursor = await db.execute('DELETE FROM queue_players WHERE queue_id = ? AND discord_id = ?', (queue_id, discord_id))
+                if cursor.rowcount > 0:
+                    await db.execute('UPDATE queues SET last_activity_at = CURRENT_TIMESTAMP WHERE id = ?', (queue_id,))
+                    await self._log_queue_events(db, [(queue_id, event_code, discord_id, None)])
                 await db.commit()
                 return cursor.rowcount > 0
         except Exception as e:
@@ -896,26 +2103,246 @@ class DatabaseManager:
     async def get_queue_players(self, queue_id: int) -> List[int]:
         try:
             async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('SELECT discord_id FROM queue_players WHERE queue_id = ? ORDER BY joined_at', (queue_id,)) as cursor:
+                async with db.execute('SELECT discord_id FROM queue_players WHERE queue_id = ? ORDER BY joined_at, id', (queue_id,)) as cursor:
                     rows = await cursor.fetchall()
                     return [row[0] for row in rows]
         except Exception as e:
             print(f"Erro ao buscar jogadores da fila: {e}")
             return []
 
-    async def update_queue_status(self, queue_id: int, status: str) -> None:
+    async def add_player_to_waitlist(self, queue_id: int, discord_id: int, front: bool = False) -> Optional[int]:
+        """Adiciona o jogador à lista de espera e retorna sua posição (1 = próximo)."""
+        position_expr = 'COALESCE(MIN(position), 1) - 1' if front else 'COALESCE(MAX(position), 0) + 1'
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(f'''
+                    INSERT INTO queue_waitlist (queue_id, discord_id, position)
+                    SELECT ?, ?, {position_expr}
+                    FROM queue_waitlist WHERE queue_id = ?
+                ''', (queue_id, discord_id, queue_id))
+                await self._log_queue_events(db, [(queue_id, queue_events.WAITLIST_JOINED, discord_id, 'topo' if front else None)])
+                await db.commit()
+        except aiosqlite.IntegrityError:
+            return None
+        except Exception as e:
+            print(f"Erro ao adicionar jogador à lista de espera: {e}")
+            return None
+        return await self.get_waitlist_position(queue_id, discord_id)
+
+    async def remove_player_from_waitlist(self, queue_id: int, discord_id: int) -> bool:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute('DELETE FROM queue_waitlist WHERE queue_id = ? AND discord_id = ?', (queue_id, discord_id))
+                if cursor.rowcount > 0:
+                    await self._log_queue_events(db, [(queue_id, queue_events.WAITLIST_LEFT, discord_id, None)])
+                await db.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Erro ao remover jogador da lista de espera: {e}")
+            return False
+
+    async def get_waitlist(self, queue_id: int) -> List[int]:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute('SELECT discord_id FROM queue_waitlist WHERE queue_id = ? ORDER BY position', (queue_id,)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [row[0] for row in rows]
+        except Exception as e:
+            print(f"Erro ao buscar lista de espera: {e}")
+            return []
+
+    async def get_waitlist_position(self, queue_id: int, discord_id: int) -> Optional[int]:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute('''
+                    SELECT COUNT(*) FROM queue_waitlist
+                    WHERE queue_id = ?
+                      AND position <= (SELECT position FROM queue_waitlist WHERE queue_id = ? AND discord_id = ?)
+                ''', (queue_id, queue_id, discord_id)) as cursor:
+                    row = await cursor.fetchone()
+                    return row[0] if row and row[0] else None
+        except Exception as e:
+            print(f"Erro ao buscar posição na lista de espera: {e}")
+            return None
+
+    async def promote_waitlist(self, source_queue_id: int, target_queue_id: int, count: int) -> List[int]:
+        """Move os primeiros `count` da lista de espera para a fila alvo.
+
+        Quando a fila alvo é outra instância, o restante da lista de espera é
+        transferido junto, preservando a ordem.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                promoted: List[int] = []
+                if count > 0:
+                    async with db.execute('''
+                        SELECT discord_id FROM queue_waitlist
+                        WHERE queue_id = ?
+                        ORDER BY position
+                        LIMIT ?
+                    ''', (source_queue_id, count)) as cursor:
+                        promoted = [row[0] for row in await cursor.fetchall()]
+                if promoted:
+                    await db.executemany(
+                        'INSERT OR IGNORE INTO queue_players (queue_id, discord_id) VALUES (?, ?)',
+                        [(target_queue_id, pid) for pid in promoted]
+                    )
+                    await db.executemany(
+                        'DELETE FROM queue_waitlist WHERE queue_id = ? AND discord_id = ?',
+                        [(source_queue_id, pid) for pid in promoted]
+                    )
+                    await db.execute('UPDATE queues SET last_activity_at = CURRENT_TIMESTAMP WHERE id = ?', (target_queue_id,))
+                events = [(target_queue_id, queue_events.WAITLIST_PROMOTED, pid, None) for pid in promoted]
+                if source_queue_id != target_queue_id:
+                    async with db.execute(
+                        'SELECT discord_id FROM queue_waitlist WHERE queue_id = ? ORDER BY position', (source_queue_id,)
+                    ) as cursor:
+                        moved = [row[0] for row in await cursor.fetchall()]
+                    await db.execute('''
+                        UPDATE OR IGNORE queue_waitlist SET queue_id = ?
+                        WHERE queue_id = ?
+                    ''', (target_queue_id, source_queue_id))
+                    await db.execute('DELETE FROM queue_waitlist WHERE queue_id = ?', (source_queue_id,))
+                    detail = f'transferido:{target_queue_id}'
+                    events = [(source_queue_id, queue_events.WAITLIST_LEFT, pid, detail) for pid in promoted + moved] + events
+                    events += [(target_queue_id, queue_events.WAITLIST_JOINED, pid, f'de:{source_queue_id}') for pid in moved]
+                await self._log_queue_events(db, events)
+                await db.commit()
+                return promoted
+        except Exception as e:
+            print(f"Erro ao promover lista de espera: {e}")
+            return []
+
+    async def get_queue_entries(self, queue_id: int) -> List[Dict[str, Any]]:
+        """Retorna os jogadores da fila com o horário de entrada (ordem de chegada)."""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute('''
+                    SELECT discord_id, joined_at FROM queue_players
+                    WHERE queue_id = ?
+                    ORDER BY joined_at
+                ''', (queue_id,)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao buscar entradas da fila: {e}")
+            return []
+
+    async def update_queue_status(self, queue_id: int, status: str, reason: Optional[str] = None) -> None:
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute('UPDATE queues SET status = ? WHERE id = ?', (status, queue_id))
+            code = queue_events.STATUS_EVENT_CODES.get(status)
+            if code:
+                await self._log_queue_events(db, [(queue_id, code, None, reason)])
+            await db.commit()
+
+    async def get_queues_by_status(self, status: str) -> List[Dict[str, Any]]:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute('SELECT * FROM queues WHERE status = ?', (status,)) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao listar filas com status {status}: {e}")
+            return []
+
+    async def _log_queue_events(self, db: aiosqlite.Connection, events: List[tuple]) -> None:
+        """Grava eventos (queue_id, code, discord_id, detail) na transação corrente."""
+        if events:
+            await db.executemany(
+                'INSERT INTO queue_events (queue_id, code, discord_id, detail) VALUES (?, ?, ?, ?)',
+                events
+            )
+
+    async def get_queue_events(self, queue_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Retorna o log de eventos da fila em ordem cronológica (os `limit` mais recentes)."""
+        query = 'SELECT * FROM queue_events WHERE queue_id = ? ORDER BY id'
+        params: tuple[Any, ...] = (queue_id,)
+        if limit:
+            query = f'SELECT * FROM ({query} DESC LIMIT ?) ORDER BY id'
+            params = (queue_id, limit)
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, params) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao buscar eventos da fila {queue_id}: {e}")
+            return []
+
+    async def replay_queue(self, queue_id: int) -> Dict[str, Any]:
+        """Reconstrói o estado da fila apenas a partir do log de eventos."""
+        return queue_events.replay_queue_events(await self.get_queue_events(queue_id))
+
+    async def restore_queue_roster(self, queue_id: int, players: List[int], waitlist: List[int]) -> None:
+        """Regrava jogadores e lista de espera de uma fila a partir de um estado reconstruído."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('DELETE FROM queue_players WHERE queue_id = ?', (queue_id,))
+            await db.execute('DELETE FROM queue_waitlist WHERE queue_id = ?', (queue_id,))
+            await db.executemany(
+                'INSERT INTO queue_players (queue_id, discord_id) VALUES (?, ?)',
+                [(queue_id, pid) for pid in players]
+            )
+            await db.executemany(
+                'INSERT INTO queue_waitlist (queue_id, discord_id, position) VALUES (?, ?, ?)',
+                [(queue_id, pid, position) for position, pid in enumerate(waitlist, 1)]
+            )
             await db.commit()
 
-    async def increment_metadata_counter(self, key: str) -> None:
+    async def record_queue_metrics(self, guild_id: int, samples: List[tuple]) -> None:
+        """Soma amostras (métrica, valor) nos histogramas da hora atual numa única transação."""
+        if not samples:
+            return
+        hour = queue_metrics.current_hour()
+        rows = [
+            (
+                guild_id,
+                hour,
+                metric,
+                0 if metric in queue_metrics.COUNTER_METRICS else queue_metrics.bucket_for(value),
+                int(value) if metric in queue_metrics.COUNTER_METRICS else 1
+            )
+            for metric, value in samples
+        ]
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany('''
+                    INSERT INTO queue_histograms (guild_id, hour, metric, bucket, count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(guild_id, hour, metric, bucket) DO UPDATE SET count = count + excluded.count
+                ''', rows)
+                await db.commit()
+        except Exception as e:
+            print(f"Erro ao registrar métricas de fila: {e}")
+
+    async def get_queue_histograms(self, hours: int = 24, guild_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        since = queue_metrics.current_hour(datetime.utcnow() - timedelta(hours=hours))
+        query = 'SELECT guild_id, hour, metric, bucket, count FROM queue_histograms WHERE hour >= ?'
+        params: tuple[Any, ...] = (since,)
+        if guild_id:
+            query += ' AND guild_id = ?'
+            params = (since, guild_id)
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(query, params) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Erro ao buscar métricas de fila: {e}")
+            return []
+
+    async def increment_metadata_counter(self, key: str, amount: int = 1) -> None:
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 await db.execute('''
                     INSERT INTO metadata(key, value)
-                    VALUES(?, '1')
-                    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
-                ''', (key,))
+                    VALUES(?, CAST(? AS TEXT))
+                    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + CAST(excluded.value AS INTEGER)
+                ''', (key, amount))
                 await db.commit()
         except Exception as e:
             print(f"Erro ao incrementar contador {key}: {e}")
@@ -935,6 +2362,14 @@ class DatabaseManager:
             print(f"Erro ao resetar PDL global: {e}")
             return 0
 
+    async def get_ranking_version(self) -> int:
+        """Versão atual dos dados do ranking (incrementada por trigger a cada mudança em players)."""
+        value = await self.get_metadata('ranking_version')
+        try:
+            return int(value) if value else 0
+        except ValueError:
+            return 0
+
     async def get_metadata(self, key: str) -> Optional[str]:
         try:
             async with aiosqlite.connect(self.db_path) as db:
@@ -0,0 +1,96 @@
+# utils/queue_events.py
+from typing import Any, Dict, Iterable, List, Optional
+
+# Códigos compactos gravados em queue_events.code (nunca reutilizar valores)
+QUEUE_CREATED = 1
+PLAYER_JOINED = 2
+PLAYER_LEFT = 3
+PLAYER_EXPIRED = 4
+WAITLIST_JOINED = 5
+WAITLIST_LEFT = 6
+WAITLIST_PROMOTED = 7
+QUEUE_ASSEMBLING = 8
+QUEUE_FINALIZED = 9
+QUEUE_CANCELLED = 10
+QUEUE_TIMED_OUT = 11
+QUEUE_ERROR = 12
+QUEUE_REOPENED = 13
+
+STATUS_EVENT_CODES = {
+    'aberta': QUEUE_REOPENED,
+    'montando': QUEUE_ASSEMBLING,
+    'concluida': QUEUE_FINALIZED,
+    'cancelada': QUEUE_CANCELLED,
+    'expirada': QUEUE_TIMED_OUT,
+    'erro': QUEUE_ERROR,
+}
+
+EVENT_LABELS = {
+    QUEUE_CREATED: 'criada',
+    PLAYER_JOINED: 'entrou',
+    PLAYER_LEFT: 'saiu',
+    PLAYER_EXPIRED: 'expirou',
+    WAITLIST_JOINED: 'lista de espera',
+    WAITLIST_LEFT: 'saiu da espera',
+    WAITLIST_PROMOTED: 'promovido',
+    QUEUE_ASSEMBLING: 'montando',
+    QUEUE_FINALIZED: 'concluída',
+    QUEUE_CANCELLED: 'cancelada',
+    QUEUE_TIMED_OUT: 'expirada',
+    QUEUE_ERROR: 'erro',
+    QUEUE_REOPENED: 'reaberta',
+}
+
+_STATUS_BY_CODE = {code: status for status, code in STATUS_EVENT_CODES.items()}
+
+
+def replay_queue_events(events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reconstrói o estado de uma fila a partir do log de eventos (em ordem de id).
+
+    Retorna status, jogadores (ordem de chegada), lista de espera, horário de
+    entrada de cada jogador e o motivo do último status registrado.
+    """
+    state: Dict[str, Any] = {
+        'status': None,
+        'players': [],
+        'waitlist': [],
+        'joined_at': {},
+        'reason': None,
+        'last_event_at': None,
+        'events': 0,
+    }
+    players: List[int] = state['players']
+    waitlist: List[int] = state['waitlist']
+
+    for event in events:
+        code = event['code']
+        discord_id: Optional[int] = event.get('discord_id')
+        state['events'] += 1
+        state['last_event_at'] = event.get('created_at')
+
+        if code == QUEUE_CREATED:
+            state['status'] = 'aberta'
+        elif code in (PLAYER_JOINED, WAITLIST_PROMOTED):
+            if discord_id in waitlist:
+                waitlist.remove(discord_id)
+            if discord_id not in players:
+                players.append(discord_id)
+                state['joined_at'][discord_id] = event.get('created_at')
+        elif code in (PLAYER_LEFT, PLAYER_EXPIRED):
+            if discord_id in players:
+                players.remove(discord_id)
+                state['joined_at'].pop(discord_id, None)
+        elif code == WAITLIST_JOINED:
+            if discord_id not in waitlist:
+                if event.get('detail') == 'topo':
+                    waitlist.insert(0, discord_id)
+                else:
+                    waitlist.append(discord_id)
+        elif code == WAITLIST_LEFT:
+            if discord_id in waitlist:
+                waitlist.remove(discord_id)
+        elif code in _STATUS_BY_CODE:
+            state['status'] = _STATUS_BY_CODE[code]
+            state['reason'] = event.get('detail')
+
+    return state
@@ -0,0 +1,74 @@
+# utils/queue_metrics.py
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Histogramas: tempos agrupados em buckets log2 (bucket b cobre [2^(b-1), 2^b)).
+# Contadores (entradas, saídas, filas concluídas) usam sempre o bucket 0.
+TIME_TO_FILL = 'fill_seconds'
+TIME_TO_FINALIZE = 'finalize_ms'
+BALANCER_LATENCY = 'balance_ms'
+QUEUE_JOINS = 'joins'
+QUEUE_LEAVES = 'leaves'
+QUEUES_COMPLETED = 'completed'
+
+COUNTER_METRICS = (QUEUE_JOINS, QUEUE_LEAVES, QUEUES_COMPLETED)
+MAX_BUCKET = 40
+
+
+def bucket_for(value: float) -> int:
+    if value < 1:
+        return 0
+    return min(MAX_BUCKET, int(math.log2(value)) + 1)
+
+
+def bucket_upper_bound(bucket: int) -> int:
+    return 1 if bucket == 0 else 2 ** bucket
+
+
+def current_hour(now: Optional[datetime] = None) -> str:
+    return (now or datetime.utcnow()).strftime('%Y-%m-%dT%H')
+
+
+def summarize_histograms(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Agrega linhas (guild_id, hour, metric, bucket, count) em totais, percentis e série por hora."""
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        data = metrics.setdefault(row['metric'], {'count': 0, 'buckets': {}, 'hours': {}, 'guilds': {}})
+        count = row['count']
+        data['count'] += count
+        data['buckets'][row['bucket']] = data['buckets'].get(row['bucket'], 0) + count
+        data['hours'][row['hour']] = data['hours'].get(row['hour'], 0) + count
+        guild_key = str(row['guild_id'])
+        data['guilds'][guild_key] = data['guilds'].get(guild_key, 0) + count
+
+    summary: Dict[str, Any] = {}
+    for metric, data in metrics.items():
+        entry: Dict[str, Any] = {
+            'count': data['count'],
+            'per_hour': dict(sorted(data['hours'].items())),
+            'per_guild': data['guilds'],
+        }
+        if metric not in COUNTER_METRICS:
+            entry['p50'] = _percentile(data['buckets'], data['count'], 0.50)
+            entry['p95'] = _percentile(data['buckets'], data['count'], 0.95)
+            entry['histogram'] = {
+                str(bucket_upper_bound(bucket)): count
+                for bucket, count in sorted(data['buckets'].items())
+            }
+        summary[metric] = entry
+    return summary
+
+
+def _percentile(buckets: Dict[int, int], total: int, fraction: float) -> Optional[int]:
+    """Estimativa pelo limite superior do bucket que contém o percentil."""
+    if total <= 0:
+        return None
+    threshold = total * fraction
+    seen = 0
+    ordered: List[int] = sorted(buckets)
+    for bucket in ordered:
+        seen += buckets[bucket]
+        if seen >= threshold:
+            return bucket_upper_bound(bucket)
+    return bucket_upper_bound(ordered[-1])
@@ -0,0 +1,98 @@
+# utils/queue_scheduler.py
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+TimerCallback = Callable[[Hashable], Awaitable[Any]]
+
+
+class QueueScheduler:
+    """Agenda única (min-heap) para todos os timers das filas.
+
+    Uma só task dorme até o próximo vencimento; agendar e reagendar custam
+    O(log n) e timers cancelados são descartados de forma preguiçosa quando
+    chegam ao topo do heap.
+    """
+
+    def __init__(self, callback: TimerCallback):
+        self._callback = callback
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, Tuple[float, int]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """Agenda (ou reagenda) o timer `key` para daqui a `delay` segundos."""
+        loop = asyncio.get_running_loop()
+        entry = (loop.time() + max(0.0, delay), next(self._counter))
+        self._deadlines[key] = entry
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(deadline, seq, k) for k, (deadline, seq) in self._deadlines.items() if k != key]
+            heapq.heapify(self._heap)
+        heapq.heappush(self._heap, (entry[0], entry[1], key))
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def schedule_at(self, key: Hashable, when: datetime) -> None:
+        """Agenda usando um horário UTC absoluto (ex.: colunas TIMESTAMP do SQLite)."""
+        self.schedule(key, (when - datetime.utcnow()).total_seconds())
+
+    def cancel(self, key: Hashable) -> None:
+        self._deadlines.pop(key, None)
+
+    def cancel_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [key for key in self._deadlines if predicate(key)]:
+            del self._deadlines[key]
+
+    def _pop_due(self, now: float) -> List[Hashable]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, seq, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == (deadline, seq):
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def _next_delay(self) -> Optional[float]:
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            if self._deadlines.get(key) == (deadline, seq):
+                return max(0.0, deadline - asyncio.get_running_loop().time())
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            try:
+                if delay is None:
+                    await self._wakeup.wait()
+                else:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            for key in self._pop_due(loop.time()):
+                try:
+                    await self._callback(key)
+                except Exception as exc:
+                    print(f"⚠️ Erro ao processar timer de fila {key}: {exc}")
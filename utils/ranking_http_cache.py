@@ -0,0 +1,101 @@
+# utils/ranking_http_cache.py
+import gzip
+import json
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Intervalo mínimo entre leituras de metadata.ranking_version; dentro dele as
+# respostas saem direto da memória, sem tocar no banco.
+VERSION_CHECK_SECONDS = 2.0
+
+# Quantidade padrão de chaves mantidas; as menos usadas saem primeiro (LRU).
+DEFAULT_MAX_ENTRIES = 256
+
+
+class RankingResponseCache:
+    """Respostas JSON pré-serializadas (e já comprimidas) por chave e versão dos dados."""
+
+    def __init__(self, version_loader: Callable[[], Awaitable[int]], max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._version_loader = version_loader
+        self._max_entries = max_entries
+        self._entries: 'OrderedDict[Any, Dict[str, Any]]' = OrderedDict()
+        self._version = -1
+        self._version_checked_at = 0.0
+
+    async def current_version(self) -> int:
+        now = time.monotonic()
+        if now - self._version_checked_at >= VERSION_CHECK_SECONDS:
+            self._version = await self._version_loader()
+            self._version_checked_at = now
+        return self._version
+
+    async def get(self, key: Any, builder: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        """Retorna {'version', 'etag', 'body', 'gzip_body'}; só chama `builder` quando a versão muda.
+
+        Se `builder` devolver None (recurso inexistente), nada é guardado e retorna None.
+        """
+        version = await self.current_version()
+        entry = self._entries.get(key)
+        if entry and entry['version'] == version:
+            self._entries.move_to_end(key)
+            return entry
+        payload = await builder()
+        if payload is None:
+            return None
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        entry = {
+            'version': version,
+            'etag': f'W/"{version}-{_key_tag(key)}"',
+            'body': body,
+            'gzip_body': gzip.compress(body, compresslevel=6),
+        }
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self._version_checked_at = 0.0
+
+
+def _key_tag(key: Any) -> str:
+    # Partes livres (ex.: nome de temporada) precisam virar ASCII sem aspas para caber no header
+    if isinstance(key, tuple):
+        return '-'.join(quote(str(part), safe='') for part in key)
+    return quote(str(key), safe='')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return '*' in candidates or any(
+        (candidate[2:] if candidate.startswith('W/') else candidate) == bare
+        for candidate in candidates
+    )
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True se o cliente aceita gzip com q > 0 (diretamente ou via `*`)."""
+    if not accept_encoding:
+        return False
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    if 'gzip' in qualities:
+        return qualities['gzip'] > 0
+    return qualities.get('*', 0) > 0
@@ -0,0 +1,118 @@
+# utils/ranking_stream.py
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from utils.database_manager import db_manager
+
+# Quantidade de posições acompanhadas pelo stream e tamanho máximo da fila de
+# cada assinante; quem não consome a tempo recebe o snapshot completo em vez dos diffs.
+STREAM_TOP_LIMIT = 50
+SUBSCRIBER_QUEUE_SIZE = 16
+HEARTBEAT_SECONDS = 15
+
+
+def _sse_message(event: str, payload: Dict[str, Any]) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+    return f"event: {event}\ndata: {data}\n\n".encode('utf-8')
+
+
+def _public_entry(position: int, player: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'position': position,
+        'discord_id': player['discord_id'],
+        'riot_id': player.get('riot_id'),
+        'pdl': player['pdl'],
+        'wins': player['wins'],
+        'losses': player['losses'],
+    }
+
+
+class RankingBroadcaster:
+    """Fan-out do ranking ao vivo via Server-Sent Events.
+
+    Cada atualização é serializada uma única vez e o mesmo bloco de bytes é
+    entregue a todas as filas de assinantes.
+    """
+
+    def __init__(self, limit: int = STREAM_TOP_LIMIT):
+        self.limit = limit
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._snapshot_message: Optional[bytes] = None
+        self._sequence = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if self._snapshot_message is None:
+            await self._load(only_if_missing=True)
+        if self._snapshot_message is not None:
+            queue.put_nowait(self._snapshot_message)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def refresh(self) -> None:
+        """Relê o topo do ranking e envia aos assinantes apenas as posições que mudaram."""
+        if not self._subscribers:
+            # Sem ninguém ouvindo, o próximo subscribe recarrega o snapshot
+            self._snapshot_message = None
+            return
+        await self._load()
+
+    async def _load(self, only_if_missing: bool = False) -> None:
+        async with self._lock:
+            if only_if_missing and self._snapshot_message is not None:
+                return
+            players = await db_manager.get_ranking_snapshot(self.limit)
+            entries = {
+                player['discord_id']: _public_entry(position, player)
+                for position, player in enumerate(players, 1)
+            }
+            changed = [entry for discord_id, entry in entries.items() if self._entries.get(discord_id) != entry]
+            removed = [discord_id for discord_id in self._entries if discord_id not in entries]
+            self._entries = entries
+            self._sequence += 1
+            updated_at = datetime.utcnow().isoformat()
+            self._snapshot_message = _sse_message('snapshot', {
+                'seq': self._sequence,
+                'updated_at': updated_at,
+                'players': list(entries.values()),
+            })
+            if (changed or removed) and self._subscribers:
+                self._broadcast(_sse_message('diff', {
+                    'seq': self._sequence,
+                    'updated_at': updated_at,
+                    'changed': changed,
+                    'removed': removed,
+                }))
+
+    def _broadcast(self, message: bytes) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Assinante lento: descarta o atraso e manda o estado completo
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot_message)
+
+    async def iter_messages(self, queue: asyncio.Queue):
+        """Mensagens do assinante, com comentário de heartbeat quando não há novidades."""
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+
+
+# Instância global
+ranking_broadcaster = RankingBroadcaster()
@@ -0,0 +1,63 @@
+# utils/rolling_stats.py
+from typing import Any, Dict, List, Optional
+
+# Quantidade de partidas acompanhadas em recent_results/recent_mvps (bit 0 = mais recente)
+RECENT_WINDOW = 20
+_RECENT_MASK = (1 << RECENT_WINDOW) - 1
+
+ROLLING_COLUMNS = (
+    'current_streak',
+    'best_win_streak',
+    'mvp_streak',
+    'best_mvp_streak',
+    'recent_results',
+    'recent_mvps',
+    'recent_count',
+    'recent_pdl',
+    'recent_pdl_sum',
+)
+
+
+def empty_state() -> Dict[str, Any]:
+    return {
+        'current_streak': 0,
+        'best_win_streak': 0,
+        'mvp_streak': 0,
+        'best_mvp_streak': 0,
+        'recent_results': 0,
+        'recent_mvps': 0,
+        'recent_count': 0,
+        'recent_pdl': '',
+        'recent_pdl_sum': 0,
+    }
+
+
+def apply_match(state: Optional[Dict[str, Any]], won: bool, is_mvp: bool, pdl_change: int) -> Dict[str, Any]:
+    """Aplica uma partida ao estado acumulado do jogador e retorna o novo estado.
+
+    current_streak é positivo para vitórias seguidas e negativo para derrotas;
+    recent_pdl guarda as últimas RECENT_WINDOW variações (mais recente primeiro)
+    para que recent_pdl_sum possa descontar a que sai da janela.
+    """
+    new = dict(empty_state() if state is None else state)
+    if won:
+        new['current_streak'] = max(new['current_streak'], 0) + 1
+        new['best_win_streak'] = max(new['best_win_streak'], new['current_streak'])
+    else:
+        new['current_streak'] = min(new['current_streak'], 0) - 1
+    new['mvp_streak'] = new['mvp_streak'] + 1 if is_mvp else 0
+    new['best_mvp_streak'] = max(new['best_mvp_streak'], new['mvp_streak'])
+
+    new['recent_results'] = ((new['recent_results'] << 1) | int(won)) & _RECENT_MASK
+    new['recent_mvps'] = ((new['recent_mvps'] << 1) | int(is_mvp)) & _RECENT_MASK
+    changes = [pdl_change] + [int(value) for value in new['recent_pdl'].split(',') if value]
+    new['recent_pdl'] = ','.join(str(value) for value in changes[:RECENT_WINDOW])
+    new['recent_pdl_sum'] = sum(changes[:RECENT_WINDOW])
+    new['recent_count'] = min(new['recent_count'] + 1, RECENT_WINDOW)
+    return new
+
+
+def recent_results(state: Dict[str, Any], count: int = RECENT_WINDOW) -> List[bool]:
+    """Resultados das últimas partidas (True = vitória), da mais recente para a mais antiga."""
+    total = min(count, state.get('recent_count') or 0)
+    return [bool(state['recent_results'] >> index & 1) for index in range(total)]